@@ -3,9 +3,15 @@
 # This software is released under an MIT-style license.
 # See LICENSE.md for full details.
 
+import array
 import asyncio
+import bisect
 import calendar
-import hashlib
+import collections
+import concurrent.futures
+import email.utils
+import heapq
+import itertools
 import logging
 import os
 import random
@@ -19,21 +25,20 @@ import warnings
 import html
 
 from argparse import ArgumentParser
-from configparser import ConfigParser
+from configparser import ConfigParser, InterpolationError
 from datetime import datetime, timedelta, timezone
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
 from pprint import pformat
 from zoneinfo import ZoneInfo
 
 import aiohttp
 import discord
-import feedparser_rs as feedparser  # Rust parser: faster + supports JSON Feed
 import feedfields
 
 from aiohttp.web_exceptions import HTTPError, HTTPNotModified
 from dateutil.parser import parse as parse_datetime
 
-__version__ = "4.3.0"
+__version__ = "5.0.0"
 
 TRACE_LEVEL = 5
 VERBOSE_LEVEL = 8
@@ -91,7 +96,7 @@ TZINFOS = {
 # 403 Forbidden, 420 Enhance Your Calm, 429 Too Many Requests, 503 Service
 # Unavailable, 508 Loop Detected, 509 Bandwidth Limit Exceeded.  When a feed
 # returns one of these we exponentially back off how often we poll it
-# (see background_check_feed).
+# (see PollScheduler.next_interval).
 BACKOFF_STATUSES = {403, 420, 429, 503, 508, 509}
 
 SQL_CREATE_FEED_INFO_TBL = """
@@ -100,7 +105,15 @@ CREATE TABLE IF NOT EXISTS feed_info (
     url text UNIQUE,
     lastmodified text,
     etag text,
-    content_hash text
+    content_hash text,
+    fresh_until text,
+    retry_until text,
+    post_interval real,
+    last_post text,
+    quiet_polls integer,
+    last_poll text,
+    next_due text,
+    backoff real
 )
 """
 
@@ -112,6 +125,36 @@ CREATE TABLE IF NOT EXISTS feed_items (
 )
 """
 
+# Messages waiting to be sent, so a restart doesn't lose them.  Rows are written
+# in the same commit that marks their items seen, deleted once sent, and
+# replayed at startup.  id is the send order; channel_id is the channel's key
+# (see ChannelSettings); not_before is epoch seconds.
+SQL_CREATE_OUTBOX_TBL = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id integer PRIMARY KEY AUTOINCREMENT,
+    feed text,
+    channel text,
+    channel_id integer,
+    message text,
+    not_before real,
+    attempts integer DEFAULT 0,
+    parts_sent integer DEFAULT 0
+)
+"""
+
+# Which URLs each channel was sent, and when (epoch seconds), for channels
+# with dedupe_days; see PostedUrls.  channel_id is the channel's key (see
+# ChannelSettings).  Rows older than the longest dedupe_days
+# are deleted by prune_old_rows().
+SQL_CREATE_CHANNEL_URLS_TBL = """
+CREATE TABLE IF NOT EXISTS channel_urls (
+    channel_id integer,
+    url text,
+    posted real,
+    PRIMARY KEY (channel_id, url)
+) WITHOUT ROWID
+"""
+
 # 10 years (3650 days). Kept this long because some feeds (e.g. frontierforums)
 # bump an item's "published" date when a reply is posted; retaining the id keeps
 # such items from being treated as new and re-sent once their row is deleted.
@@ -121,11 +164,27 @@ ITEM_MAX_AGE_DAYS = 3650
 # call time) rather than wrapping the column in julianday(): a bare column `<`
 # comparison lets SQLite use the feed_items_published index instead of scanning.
 # Safe because every stored `published` is canonical UTC ISO-8601 (...+00:00),
-# which sorts lexicographically in chronological order.
+# which sorts lexicographically in chronological order.  Deletes at most
+# RETENTION_CHUNK rows per call; see prune_old_rows().
 SQL_CLEAN_OLD_ITEMS = """
-DELETE FROM feed_items WHERE published < ?
+DELETE FROM feed_items WHERE rowid IN (
+    SELECT rowid FROM feed_items WHERE published < ? LIMIT ?
+)
+"""
+
+SQL_CLEAN_OLD_CHANNEL_URLS = """
+DELETE FROM channel_urls WHERE (channel_id, url) IN (
+    SELECT channel_id, url FROM channel_urls WHERE posted < ? LIMIT ?
+)
 """
 
+# Old rows are deleted in the background, this many per transaction, so a
+# large backlog never holds the database for long.  A pass runs
+# RETENTION_DELAY seconds after startup and then every RETENTION_INTERVAL.
+RETENTION_CHUNK = 1000
+RETENTION_DELAY = 60
+RETENTION_INTERVAL = 86400
+
 
 if not sys.version_info[:2] >= (3, 9):
     print("Error: requires python 3.9 or newer")
@@ -305,18 +364,272 @@ def get_timezone(config):
 
 
 def get_feeds_config(config):
-    """Return a list of feed section names (all sections except MAIN and CHANNELS). Called by main()."""
+    """Return a list of feed section names (all sections except MAIN, CHANNELS, HOSTS and WEBHOOKS). Called by main()."""
     feeds = list(config.sections())
 
     # remove non-feed sections
     feeds.remove("MAIN")
     feeds.remove("CHANNELS")
+    for optional in ("HOSTS", "WEBHOOKS"):
+        if optional in feeds:
+            feeds.remove(optional)
 
     return feeds
 
 
+class _Settings:
+    """Base of the settings classes: each attribute can be set only once."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__}.{name} is read-only")
+        object.__setattr__(self, name, value)
+
+
+class _OptionReader:
+    """Typed reads of one config section, for building the settings objects.
+
+    ``prefix`` names an override tried before the plain option (``one`` reads
+    ``one.delay``, then ``delay``).  A value that can't be used is added to
+    ``errors`` and the default returned instead, so one validation pass can
+    report every problem in the file.
+    """
+
+    def __init__(self, section, errors):
+        self.section = section
+        self.errors = errors
+
+    def key(self, name, prefix):
+        if prefix is not None and prefix + "." + name in self.section:
+            return prefix + "." + name
+        return name
+
+    def _read(self, getter, name, default, prefix):
+        key = self.key(name, prefix)
+        try:
+            return getter(key, default)
+        except (ValueError, InterpolationError) as e:
+            self.errors.append(f"[{self.section.name}] {key}: {e}")
+            return default
+
+    def get(self, name, default=None, prefix=None):
+        return self._read(self.section.get, name, default, prefix)
+
+    def getint(self, name, default, prefix=None):
+        return self._read(self.section.getint, name, default, prefix)
+
+    def getboolean(self, name, default, prefix=None):
+        return self._read(self.section.getboolean, name, default, prefix)
+
+    def choice(self, name, default, choices, prefix=None):
+        value = self.get(name, default, prefix)
+        if value not in choices:
+            key = self.key(name, prefix)
+            self.errors.append(
+                f"[{self.section.name}] {key}: {value!r} is not one of "
+                + ", ".join(choices)
+            )
+            return default
+        return value
+
+
+def _webhook_id(url):
+    """Return the id in a webhook URL (``.../webhooks/<id>/<token>``), or None."""
+    parts = urlsplit(url).path.rstrip("/").split("/")
+    if len(parts) >= 3 and parts[-3] == "webhooks" and parts[-2].isdigit():
+        return parts[-2]
+    return None
+
+
+class ChannelSettings(_Settings):
+    """One channel's options within a feed section (``name.option`` overrides).
+
+    ``filter`` is the compiled ``filter``/``filter_exclude`` pattern (None for
+    no filter); ``filter_exclude`` says which of the two it is.
+    ``digest_threshold`` (0 for never) and ``digest_fields`` configure digest
+    mode; see _build_sends().  ``dedupe_days`` (0 for off) is how long a URL
+    sent to the channel keeps it from being sent again; see PostedUrls.
+    ``webhook`` is the channel's [WEBHOOKS] URL, or None.  ``key`` is what
+    its messages are queued, stored in the outbox and deduplicated under:
+    the channel id, or for a channel with only a webhook, the webhook's id
+    (both are Discord snowflakes, so they can't collide).  Built by
+    FeedSettings.
+    """
+
+    __slots__ = (
+        "dedupe_days",
+        "delay",
+        "digest_fields",
+        "digest_threshold",
+        "fields",
+        "filter",
+        "filter_exclude",
+        "filter_field",
+        "filter_match",
+        "id",
+        "key",
+        "max_messages",
+        "name",
+        "send_interval",
+        "webhook",
+    )
+
+    def __init__(self, name, options, channel_ids, webhooks=None):
+        FEED = options.section
+        self.name = name
+        self.id = _OptionReader(channel_ids, options.errors).getint(name, None)
+        webhook = None
+        key = self.id
+        if webhooks is not None and name in webhooks:
+            webhook = webhooks[name]
+            webhook_id = _webhook_id(webhook)
+            if not webhook.startswith(("https://", "http://")) or webhook_id is None:
+                options.errors.append(f"[WEBHOOKS] {name}: not a webhook URL")
+            elif key is None:
+                key = int(webhook_id)
+        self.webhook = webhook
+        self.key = key
+        self.fields = tuple(
+            options.get("fields", "id,description", prefix=name).split(",")
+        )
+        self.filter_field = options.get("filter_field", "title", prefix=name)
+        self.filter_match = options.choice(
+            "filter_match", "rendered", FILTER_MATCH_MODES, prefix=name
+        )
+        self.delay = options.getint("delay", 0, prefix=name)
+        self.send_interval = options.getint("send_interval", 3, prefix=name)
+        self.max_messages = options.getint("max_messages", 0, prefix=name)
+        self.digest_threshold = options.getint("digest_threshold", 0, prefix=name)
+        self.dedupe_days = options.getint("dedupe_days", 0, prefix=name)
+        self.digest_fields = tuple(
+            options.get("digest_fields", "**title**,<link>", prefix=name).split(",")
+        )
+        if name + ".filter" in FEED or "filter" in FEED:
+            self.filter_exclude = False
+            pattern = options.get("filter", "^.*$", prefix=name)
+        elif name + ".filter_exclude" in FEED or "filter_exclude" in FEED:
+            self.filter_exclude = True
+            pattern = options.get("filter_exclude", "^.*$", prefix=name)
+        else:
+            self.filter_exclude = False
+            pattern = None
+        regex = None
+        if pattern is not None:
+            try:
+                regex = re.compile(pattern)
+            except re.error as e:
+                kind = "filter_exclude" if self.filter_exclude else "filter"
+                key = options.key(kind, name)
+                options.errors.append(
+                    f"[{FEED.name}] {key}: bad regular expression {pattern!r} ({e})"
+                )
+        self.filter = regex
+
+
+class FeedSettings(_Settings):
+    """A feed section's options, read and converted once at startup.
+
+    The poll, render and send paths read these attributes instead of asking
+    configparser, whose every lookup walks the DEFAULT section, interpolates
+    and converts.  ``channels`` holds a ChannelSettings per name in the
+    section's ``channels`` option; ``url_fields`` is what _extract_item_urls()
+    reads.  Built by load_feed_settings().
+    """
+
+    __slots__ = (
+        "adaptive_refresh",
+        "backoff_max",
+        "channels",
+        "feed_url",
+        "item_url_base",
+        "max_age",
+        "max_paragraphs",
+        "name",
+        "publish",
+        "refresh_max",
+        "refresh_min",
+        "render_engine",
+        "rss_refresh_time",
+        "send_typing",
+        "skip_elements",
+        "start_skew",
+        "start_skew_min",
+        "url_fields",
+        "wrap_urls",
+    )
+
+    def __init__(self, config, feed, errors):
+        options = _OptionReader(config[feed], errors)
+        self.name = feed
+        self.feed_url = options.get("feed_url")
+        self.max_age = options.getint("max_age", 86400)
+        self.rss_refresh_time = options.getint("rss_refresh_time", 3600)
+        self.start_skew = options.getint("start_skew", self.rss_refresh_time)
+        self.start_skew_min = options.getint("start_skew_min", 1)
+        self.backoff_max = options.getint("backoff_max", 86400)
+        self.adaptive_refresh = options.getboolean("adaptive_refresh", False)
+        self.refresh_min = options.getint("refresh_min", 300)
+        self.refresh_max = options.getint("refresh_max", 21600)
+        # Overridable as <feed>.send_typing, even in [DEFAULT].
+        self.send_typing = bool(options.getint("send_typing", 0, prefix=feed))
+        # [MAIN] publish, if set, wins over the feed's own.
+        publish = options.getint("publish", 0)
+        self.publish = (
+            _OptionReader(config["MAIN"], errors).getint("publish", publish) >= 1
+        )
+        self.item_url_base = options.get("item_url_base")
+        self.skip_elements = options.get("skip_elements", "")
+        self.max_paragraphs = options.getint("max_paragraphs", 0)
+        self.wrap_urls = options.getboolean("wrap_urls", True)
+        self.render_engine = options.choice(
+            "render_engine",
+            feedfields.DEFAULT_RENDER_ENGINE,
+            tuple(feedfields.RENDER_ENGINES),
+        )
+        names = options.get("channels")
+        if not names:
+            errors.append(f"[{feed}] channels: no channels configured")
+            names = ""
+        self.channels = tuple(
+            ChannelSettings(
+                name.strip(),
+                options,
+                config["CHANNELS"],
+                config["WEBHOOKS"] if config.has_section("WEBHOOKS") else None,
+            )
+            for name in names.split(",")
+            if name.strip()
+        )
+        self.url_fields = _url_fields(
+            spec for channel in self.channels for spec in channel.fields
+        )
+
+
+def load_feed_settings(config, feeds):
+    """Read and check every feed section's options; return their FeedSettings.
+
+    Every problem found -- a number or true/false option that isn't one, an
+    unknown render_engine, filter_match or [MAIN] delivery, a filter that
+    isn't a valid regular expression, a feed with no channels -- is reported
+    together in one ImproperlyConfigured, before the bot connects.  Called by
+    main().
+    """
+    errors = []
+    _OptionReader(config["MAIN"], errors).choice("delivery", "gateway", DELIVERY_MODES)
+    settings = [FeedSettings(config, feed, errors) for feed in feeds]
+    # Each feed reads [MAIN] publish; report a bad one once.
+    errors = list(dict.fromkeys(errors))
+    if errors:
+        raise ImproperlyConfigured(
+            f"{len(errors)} problem(s) in the configuration:\n  " + "\n  ".join(errors)
+        )
+    return settings
+
+
 def get_sql_connection(config):
-    """Open and return an SQLite connection with WAL mode enabled. Called by sql_maintenance() and background_check_feed()."""
+    """Open and return an SQLite connection with WAL mode enabled. Called by sql_maintenance(), load_seen_index() and FeedDatabase."""
     db_path = config["MAIN"].get("db_path", "feed2discord.db")
     conn = sqlite3.connect(db_path)
     # WAL: cheaper commits (~0.8ms vs ~1.9ms fsync) and concurrent reads while
@@ -326,31 +639,156 @@ def get_sql_connection(config):
     return conn
 
 
+def _commit_or_rollback(conn):
+    """Commit, or roll everything back if the commit fails. Called by FeedDatabase.
+
+    A failed commit can otherwise leave the writes pending, to be committed
+    by some later one -- after their poll has been told they were lost.
+    """
+    try:
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+class FeedDatabase:
+    """The bot's one long-lived SQLite connection, owned by its own thread.
+
+    Feed tasks hand it work with ``await db.run(fn, *args)``, which calls
+    ``fn(conn, *args)`` on the database thread, so SQLite never blocks the
+    event loop.  Writes are group-committed: ``await db.commit()`` waits for
+    the next commit, which runs at most every ``commit_interval`` seconds and
+    covers everything written since the last one, from every feed -- one
+    fsync for many polls.  If that commit fails it is rolled back, and every
+    waiting ``commit()`` raises.  Created by get_feed_db().
+    """
+
+    def __init__(self, config, commit_interval):
+        self.config = config
+        self.commit_interval = commit_interval
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            1, thread_name_prefix="sqlite"
+        )
+        # Opened on first use, on the database thread (sqlite3 connections
+        # may only be used by the thread that made them).
+        self.conn = None
+        self._waiters = []
+        self._committer = None
+        # Held by a poll from its channel_urls lookup until its rows are
+        # stored, so two feeds polled at once can't both send a channel the
+        # same URL.  See poll_source().
+        self.channel_urls_lock = asyncio.Lock()
+
+    def _call(self, fn, args):
+        if self.conn is None:
+            self.conn = get_sql_connection(self.config)
+        return fn(self.conn, *args)
+
+    async def run(self, fn, *args):
+        """Return ``fn(conn, *args)``, run on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, self._call, fn, args
+        )
+
+    async def commit(self):
+        """Wait until everything written so far is committed."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._committer is None:
+            self._committer = asyncio.create_task(self._group_commit())
+        await waiter
+
+    def commit_soon(self):
+        """Have the next group commit cover what's written so far, without waiting."""
+        if self._committer is None:
+            self._committer = asyncio.create_task(self._group_commit())
+
+    async def _group_commit(self):
+        await asyncio.sleep(self.commit_interval)
+        self._committer = None
+        waiters, self._waiters = self._waiters, []
+        try:
+            await self.run(_commit_or_rollback)
+        except sqlite3.Error as err:
+            logger.error("database commit failed, changes rolled back: %s", err)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(err)
+        else:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def _close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    async def close(self):
+        """Commit anything pending and close the connection. Called by main()."""
+        if self._committer is not None:
+            self._committer.cancel()
+            self._committer = None
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._close)
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self.executor.shutdown()
+
+
 def sql_maintenance(config):
-    """Create tables, run migrations, and purge items older than 10 years. Called by main()."""
+    """Create tables and run any migrations not yet applied. Called by main().
+
+    Cheap on an up-to-date database whatever its size: old rows are purged
+    later, in the background, by prune_old_rows().
+    """
     conn = get_sql_connection(config)
 
-    # If our two tables don't exist, create them.
+    # If our tables don't exist, create them.
     conn.execute(SQL_CREATE_FEED_INFO_TBL)
     conn.execute(SQL_CREATE_FEED_ITEMS_TBL)
+    conn.execute(SQL_CREATE_OUTBOX_TBL)
+    conn.execute(SQL_CREATE_CHANNEL_URLS_TBL)
 
     migrate_db(conn)
 
-    # Clean out *some* entries that are over 10 years old...
-    # Doing this cleanup at start time because some feeds
-    # do contain very old items and we don't want to keep
-    # re-evaluating them.
-    cutoff = (
-        datetime.now(timezone.utc) - timedelta(days=ITEM_MAX_AGE_DAYS)
-    ).isoformat()
-    conn.execute(SQL_CLEAN_OLD_ITEMS, [cutoff])
-
     conn.commit()
     conn.close()
 
 
 def migrate_db(conn):
-    """Apply schema migrations and data fixes to an existing database."""
+    """Apply the MIGRATIONS the database hasn't had yet, in order.
+
+    ``PRAGMA user_version`` records how many have been applied, so each runs
+    exactly once and an up-to-date database costs a single PRAGMA.  Each
+    step runs in its own transaction, together with setting its version
+    number, so a step that fails leaves no trace and runs again next start.
+    """
+    conn.commit()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        # sqlite3 only opens transactions itself before INSERT/UPDATE/DELETE,
+        # so ALTER TABLE and the PRAGMA need an explicit BEGIN.
+        conn.execute("BEGIN")
+        try:
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        logger.notice("migrate_db: database now at version %d", number)
+
+
+def _migrate_v1(conn):
+    """Bring any database made before versioned migrations up to date.
+
+    Every change here checks whether it's needed first, so it's safe on a
+    database that already has some or all of them.
+    """
     feed_info_cols = {r[1] for r in conn.execute("PRAGMA table_info(feed_info)")}
     feed_items_cols = {r[1] for r in conn.execute("PRAGMA table_info(feed_items)")}
 
@@ -358,6 +796,27 @@ def migrate_db(conn):
         conn.execute("ALTER TABLE feed_info ADD COLUMN content_hash text")
         logger.notice("migrate_db: added content_hash column to feed_info")
 
+    for col in ("fresh_until", "retry_until"):
+        # Server freshness hints (Cache-Control/Expires, Retry-After), as UTC
+        # ISO-8601: don't poll the feed again before these times.
+        if col not in feed_info_cols:
+            conn.execute("ALTER TABLE feed_info ADD COLUMN %s text" % col)
+            logger.notice("migrate_db: added %s column to feed_info", col)
+
+    for col, coltype in (
+        ("post_interval", "real"),
+        ("last_post", "text"),
+        ("quiet_polls", "integer"),
+        ("last_poll", "text"),
+        ("next_due", "text"),
+        ("backoff", "real"),
+    ):
+        # Observed publish cadence, for adaptive_refresh (see FeedSource), and
+        # the poll schedule, so a restart resumes it (see PollScheduler.run()).
+        if col not in feed_info_cols:
+            conn.execute("ALTER TABLE feed_info ADD COLUMN %s %s" % (col, coltype))
+            logger.notice("migrate_db: added %s column to feed_info", col)
+
     dead_cols = {"title", "url", "reposted"} & feed_items_cols
     if dead_cols:
         # ALTER TABLE DROP COLUMN requires SQLite 3.35+; use table-rebuild for
@@ -394,6 +853,9 @@ def migrate_db(conn):
     conn.execute(
         "CREATE INDEX IF NOT EXISTS feed_items_published ON feed_items(published)"
     )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS channel_urls_posted ON channel_urls(posted)"
+    )
 
     # Index for locating a row by its stored url (to delete it and force a
     # re-post).  NOCASE collation so the default case-insensitive LIKE can use it
@@ -433,6 +895,11 @@ def migrate_db(conn):
         logger.notice("migrate_db: deleted %d unparseable feed item row(s)", deleted)
 
 
+# Schema migrations, oldest first.  migrate_db() applies the ones a database
+# hasn't had; append new ones here and never change or reorder old ones.
+MIGRATIONS = (_migrate_v1,)
+
+
 config, logger = get_config()
 
 # Make main config area global, since used everywhere/anywhere
@@ -450,15 +917,610 @@ client = discord.Client(
     intents=intents,
 )
 
+# [MAIN] delivery values: "gateway" posts through the discord.py client and
+# its gateway session; "rest" only uses Discord's HTTP API, via DiscordRest.
+DELIVERY_MODES = ("gateway", "rest")
+REST_DELIVERY = MAIN.get("delivery", "gateway") == "rest"
+
 # Feed names for which we've auto-disabled typing this run because Discord
 # rate-limited the typing endpoint.  Resets on restart.
 typing_disabled = set()
 
+# Role name -> role id for each guild, so @field tag mentions are a lookup per
+# tag.  Filled by guild_role_ids(); the role and guild events below drop a
+# guild's entry when its roles change, and on_ready() drops them all.
+_guild_role_ids = {}
+
+# Optional in-memory index of feed_items ids ([MAIN] seen_index), so polls
+# can skip already-seen entries without asking SQLite.  Built by main() via
+# load_seen_index(); None when disabled.
+seen_index = None
+
+# One HTTP session -- and so one connection pool, DNS cache and set of
+# keep-alive connections -- shared by every feed task, so feeds on the same host
+# reuse TCP/TLS connections instead of each paying for its own handshake.
+# Created lazily by get_http_session() because it must be made inside the
+# running event loop; closed by main() on shutdown.
+_http_session = None
+
+
+def get_http_session():
+    """Return the process-wide aiohttp session, creating it on first use.
+
+    The connector is tuned from [MAIN]: http_max_connections (total open
+    connections, default 100), http_max_per_host (default 4, so one busy host
+    can't hog the pool), dns_cache_ttl (seconds, default 300) and
+    http_keepalive (seconds an idle connection is kept for reuse, default 60).
+    Called by poll_source().
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=MAIN.getint("http_max_connections", 100),
+            limit_per_host=MAIN.getint("http_max_per_host", 4),
+            ttl_dns_cache=MAIN.getint("dns_cache_ttl", 300),
+            keepalive_timeout=MAIN.getint("http_keepalive", 60),
+        )
+        _http_session = aiohttp.ClientSession(connector=connector)
+    return _http_session
+
+
+# Pool that feed bytes are parsed in, so a big feed doesn't stall the event
+# loop (and with it every other feed and the Discord connection).  Created by
+# get_parse_executor(); shut down by main().
+_parse_executor = None
+
+
+def get_parse_executor():
+    """Return the feed-parsing pool, creating it on first use; None parses inline.
+
+    Configured from [MAIN] parse_pool: ``process`` (default) or ``thread``,
+    with parse_workers workers (default 2; 0 parses on the event loop as
+    before).  feedparser_rs holds the GIL while parsing, so only a process
+    pool really keeps the loop free; a thread pool is the lighter option for
+    small feeds.  Called by _parse_feed() and main().
+    """
+    global _parse_executor
+    workers = MAIN.getint("parse_workers", 2)
+    if workers <= 0:
+        return None
+    if _parse_executor is None:
+        if MAIN.get("parse_pool", "process") == "thread":
+            _parse_executor = concurrent.futures.ThreadPoolExecutor(
+                workers, thread_name_prefix="parse"
+            )
+        else:
+            _parse_executor = concurrent.futures.ProcessPoolExecutor(workers)
+    return _parse_executor
+
+
+# The shared database connection and its writer thread.  Created lazily by
+# get_feed_db() (its commit timer needs the running loop); closed by main().
+_feed_db = None
+
+
+def get_feed_db():
+    """Return the process-wide FeedDatabase, creating it on first use.
+
+    [MAIN] db_commit_interval sets how often it commits, in seconds (default
+    0.25).  Called by poll_source() and PollScheduler.run().
+    """
+    global _feed_db
+    if _feed_db is None:
+        _feed_db = FeedDatabase(config, MAIN.getfloat("db_commit_interval", 0.25))
+    return _feed_db
+
+
+def _delete_old_rows(conn, sql, cutoff):
+    """Delete one chunk of rows older than cutoff; return how many. Called by prune_old_rows()."""
+    return conn.execute(sql, [cutoff, RETENTION_CHUNK]).rowcount
+
+
+async def prune_old_rows(dedupe_days):
+    """Delete expired feed_items and channel_urls rows, forever. Started by main().
+
+    feed_items rows go after ITEM_MAX_AGE_DAYS, since some feeds contain
+    very old items and we don't want to keep re-evaluating them;
+    channel_urls rows go after ``dedupe_days`` (the longest any channel
+    uses).  Rows are deleted RETENTION_CHUNK at a time, each chunk committed
+    before the next, so polls get the database in between.
+    """
+    db = get_feed_db()
+    await asyncio.sleep(RETENTION_DELAY)
+    while True:
+        cutoffs = (
+            (
+                "feed_items",
+                SQL_CLEAN_OLD_ITEMS,
+                (
+                    datetime.now(timezone.utc) - timedelta(days=ITEM_MAX_AGE_DAYS)
+                ).isoformat(),
+            ),
+        )
+        if dedupe_days > 0:
+            # With dedupe off there's nothing to expire; don't wipe the
+            # table in case it's turned back on.
+            cutoffs += (
+                (
+                    "channel_urls",
+                    SQL_CLEAN_OLD_CHANNEL_URLS,
+                    time.time() - dedupe_days * 86400,
+                ),
+            )
+        for table, sql, cutoff in cutoffs:
+            total = 0
+            try:
+                while True:
+                    deleted = await db.run(_delete_old_rows, sql, cutoff)
+                    await db.commit()
+                    total += deleted
+                    if deleted < RETENTION_CHUNK:
+                        break
+            except sqlite3.Error:
+                logger.exception("retention: could not delete old %s rows", table)
+            if total:
+                logger.notice("retention: deleted %d old %s row(s)", total, table)
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+
+# First (and smallest) host-wide backoff, in seconds, after a host rate-limits
+# us; doubles on each further rate-limited response, up to backoff_max.
+HOST_BACKOFF_MIN = 60
+
+
+class HostLimiter:
+    """Politeness state for one host, shared by every feed source on it.
+
+    Every fetch consults it first (see PollScheduler._dispatch): a token
+    bucket refilled at ``max_per_minute`` (0 = unlimited), a cap of
+    ``max_in_flight`` concurrent fetches, and a host-wide backoff.  A
+    rate-limited response (BACKOFF_STATUSES) on *any* of the host's feeds backs
+    off the whole host -- HOST_BACKOFF_MIN seconds, doubling up to
+    ``backoff_max`` -- so its other feeds stop piling on; the next good
+    response clears it.
+    """
+
+    def __init__(self, host, max_per_minute, max_in_flight, backoff_max):
+        self.host = host
+        self.rate = max_per_minute / 60.0  # tokens per second
+        self.max_in_flight = max_in_flight
+        # Allow a burst only as big as can actually run at once.
+        self.capacity = max(1, max_in_flight)
+        self.tokens = self.capacity
+        self.refilled = time.monotonic()
+        self.in_flight = 0
+        self.parked = collections.deque()  # sources waiting for a free slot
+        self.backoff = 0
+        self.backoff_max = backoff_max
+        self.backoff_until = 0
+
+    def acquire(self, source):
+        """Claim a fetch slot (and a token) for source.
+
+        Returns 0 once claimed; seconds to wait if the host is backing off or
+        out of tokens; or None if every slot is busy, in which case source is
+        parked and handed back by release().
+        """
+        now = time.monotonic()
+        if now < self.backoff_until:
+            return self.backoff_until - now
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            self.parked.append(source)
+            return None
+        if self.rate:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.refilled) * self.rate
+            )
+            self.refilled = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def release(self, outcome, retry_until=None):
+        """Free a slot after a poll with the given POLL_* outcome.
+
+        A rate-limited response carrying Retry-After (``retry_until``, epoch
+        seconds) holds the host exactly that long instead of the doubling
+        backoff.  Returns the parked sources, to be dispatched again.
+        """
+        self.in_flight -= 1
+        if outcome == POLL_BACKOFF:
+            if retry_until is not None:
+                hold = min(retry_until - time.time(), self.backoff_max)
+            else:
+                self.backoff = min(
+                    max(self.backoff * 2, HOST_BACKOFF_MIN), self.backoff_max
+                )
+                hold = self.backoff
+            self.backoff_until = time.monotonic() + hold
+            logger.warning(
+                "host %s:rate-limited; holding all its feeds for %d seconds",
+                self.host,
+                hold,
+            )
+        elif outcome in (POLL_CHANGED, POLL_UNCHANGED) and self.backoff:
+            logger.warning("host %s:recovered; no longer backing off", self.host)
+            self.backoff = 0
+        parked = list(self.parked)
+        self.parked.clear()
+        return parked
+
+
+# HostLimiters by hostname, created on demand by get_host_limiter().
+host_limiters = {}
+
+
+def _host_setting(host, key, default):
+    """Return an int host setting: [HOSTS] <host>.<key>, else [MAIN] host_<key>."""
+    fallback = MAIN.getint("host_" + key, default)
+    if not config.has_section("HOSTS"):
+        return fallback
+    return config["HOSTS"].getint(host + "." + key, fallback)
+
+
+def get_host_limiter(feed_url):
+    """Return the shared HostLimiter for feed_url's host. Called by FeedSource()."""
+    host = urlsplit(feed_url).hostname or ""
+    limiter = host_limiters.get(host)
+    if limiter is None:
+        limiter = HostLimiter(
+            host,
+            _host_setting(host, "max_per_minute", 0),
+            _host_setting(host, "max_in_flight", MAIN.getint("http_max_per_host", 4)),
+            _host_setting(host, "backoff_max", 3600),
+        )
+        host_limiters[host] = limiter
+    return limiter
+
+
+# Discord channel type of announcement ("news") channels, which can publish.
+DISCORD_NEWS_CHANNEL = 5
 
-def extract_best_item_date(item, tzinfo):
-    """Return the best date for a feed item as a UTC-aware datetime, falling back to now. Called by background_check_feed()."""
-    fields = ("published", "pubDate", "date", "created", "updated", "expiry")
-    for date_field in fields:
+# Seconds a RestChannel's channel type and guild roles are trusted before
+# they're read again (there's no gateway to announce changes).
+REST_INFO_TTL = 3600
+
+# Requests DiscordRest makes for one call while Discord answers 429, before
+# giving up with discord.errors.RateLimited.
+REST_MAX_TRIES = 5
+
+
+class _RestBucket:
+    """One Discord rate-limit bucket: requests left, and when it refills."""
+
+    __slots__ = ("lock", "remaining", "reset_at")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.remaining = None  # unknown until Discord says
+        self.reset_at = 0.0  # monotonic
+
+
+class DiscordRest:
+    """Discord's HTTP API, used without a gateway session.
+
+    Posts for RestChannel and WebhookChannel over its own aiohttp session
+    (so Discord calls don't compete with feed fetches for connections),
+    keeping its own rate-limit state instead of discord.py's: Discord names
+    each route's bucket (X-RateLimit-Bucket), and a bucket plus the route's
+    major parameter (channel, guild or webhook id) has X-RateLimit-Remaining
+    requests left until X-RateLimit-Reset-After.  Requests to a bucket are
+    made one at a time, waiting for it to refill when it's used up; a 429
+    waits out its retry_after (every bucket waits if it's global).  Errors are
+    raised as discord.py's own exceptions, so the send path handles both
+    modes alike.  ``api_base`` is [MAIN] discord_api, so it can be pointed at
+    a stand-in server.  Created by get_discord_rest().
+    """
+
+    def __init__(self, api_base, token):
+        self.api_base = api_base.rstrip("/")
+        self.token = token
+        self.user_agent = (
+            f"DiscordBot (https://github.com/freiheit/discord_feedbot, {__version__})"
+        )
+        self.route_buckets = {}  # route -> bucket name Discord gave it
+        self.buckets = {}  # (bucket name or route, major) -> _RestBucket
+        self.global_until = 0.0  # monotonic
+        self.channels = {}  # channel id or webhook URL -> RestChannel
+        self.guilds = {}  # guild id -> _RestGuild
+        self.session = None  # created on first request, in the event loop
+
+    def _bucket(self, route, major):
+        key = (self.route_buckets.get(route, route), major)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = _RestBucket()
+        return bucket
+
+    async def request(self, method, route, major, url=None, json=None, auth=True):
+        """Make one API call and return its decoded JSON (None if empty).
+
+        ``route`` is the path template, e.g. ``/channels/{id}/messages``,
+        with ``major`` filled in for ``{id}``; ``url`` overrides the whole URL
+        (webhooks).  Waits as Discord's rate limits require.
+        """
+        if url is None:
+            url = self.api_base + route.replace("{id}", str(major))
+        headers = {"User-Agent": self.user_agent}
+        if auth:
+            headers["Authorization"] = "Bot " + self.token
+        bucket = self._bucket(route, major)
+        async with bucket.lock:
+            retry_after = 0
+            for _ in range(REST_MAX_TRIES):
+                now = time.monotonic()
+                wait = self.global_until - now
+                if bucket.remaining == 0:
+                    wait = max(wait, bucket.reset_at - now)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if self.session is None:
+                    self.session = aiohttp.ClientSession()
+                async with self.session.request(
+                    method, url, headers=headers, json=json
+                ) as response:
+                    bucket = self._track(route, major, bucket, response.headers)
+                    data = None
+                    if response.content_type == "application/json":
+                        data = await response.json()
+                    if response.status != 429:
+                        break
+                    retry_after = float(
+                        (data or {}).get("retry_after")
+                        or response.headers.get("Retry-After", 1)
+                    )
+                    until = time.monotonic() + retry_after
+                    if (data or {}).get("global") or response.headers.get(
+                        "X-RateLimit-Global"
+                    ):
+                        self.global_until = until
+                    else:
+                        bucket.remaining = 0
+                        bucket.reset_at = until
+                    logger.warning(
+                        "discord:%s %s rate-limited; waiting %.1f seconds",
+                        method,
+                        route,
+                        retry_after,
+                    )
+            else:
+                raise discord.errors.RateLimited(retry_after)
+        if response.status < 300:
+            return data
+        if response.status == 403:
+            raise discord.errors.Forbidden(response, data)
+        if response.status == 404:
+            raise discord.errors.NotFound(response, data)
+        if response.status >= 500:
+            raise discord.errors.DiscordServerError(response, data)
+        raise discord.errors.HTTPException(response, data)
+
+    def _track(self, route, major, bucket, headers):
+        """Update bucket from a response's X-RateLimit headers, and return it.
+
+        Once Discord names the route's bucket, the returned bucket is the one
+        filed under that name, which may not be the one passed in.
+        """
+        name = headers.get("X-RateLimit-Bucket")
+        if name is not None and self.route_buckets.get(route) != name:
+            # Learned which bucket the route shares; file this one under it.
+            self.route_buckets[route] = name
+            bucket = self.buckets.setdefault((name, major), bucket)
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            bucket.remaining = int(remaining)
+            bucket.reset_at = time.monotonic() + float(reset_after)
+        return bucket
+
+    async def start(self):
+        """Check the bot token, if there is one. Called by PollScheduler.run()."""
+        if not self.token:
+            logger.notice("Posting through webhooks only (no login_token)")
+            return
+        try:
+            user = await self.request("GET", "/users/@me", None)
+        except discord.errors.HTTPException as e:
+            logger.error("Discord API login failed: %s", e)
+            raise
+        logger.notice(
+            "Using the Discord API as %s (id=%s), without a gateway session",
+            user["username"],
+            user["id"],
+        )
+
+    def channel(self, channel_settings):
+        """Return the RestChannel (or WebhookChannel) for a channel's settings."""
+        key = channel_settings.webhook or channel_settings.id
+        channel = self.channels.get(key)
+        if channel is None:
+            if channel_settings.webhook:
+                channel = WebhookChannel(self, channel_settings.webhook)
+            else:
+                channel = RestChannel(self, channel_settings.id)
+            self.channels[key] = channel
+        return channel
+
+    async def close(self):
+        """Close the HTTP session. Called by main()."""
+        if self.session is not None:
+            await self.session.close()
+
+    def guild(self, guild_id):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = _RestGuild(guild_id)
+        return guild
+
+
+# What _compile_tag needs of a role: its id and name.
+_RestRole = collections.namedtuple("_RestRole", "id name")
+
+
+class _RestGuild:
+    """A guild's id and roles, read over the API (see guild_role_ids())."""
+
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.roles = []
+        self.loaded = None  # monotonic
+
+    async def refresh(self, rest):
+        if not rest.token or self.id is None:
+            return  # reading roles needs the bot
+        if self.loaded is not None and time.monotonic() - self.loaded < REST_INFO_TTL:
+            return
+        roles = await rest.request("GET", "/guilds/{id}/roles", self.id)
+        self.roles = [_RestRole(role["id"], role["name"]) for role in roles]
+        self.loaded = time.monotonic()
+        _guild_role_ids.pop(self.id, None)
+
+
+class _RestMessage:
+    def __init__(self, channel, message_id):
+        self.channel = channel
+        self.id = message_id
+
+    async def publish(self):
+        rest = self.channel.rest
+        await rest.request(
+            "POST",
+            "/channels/{id}/messages/{message}/crosspost",
+            self.channel.id,
+            url=f"{rest.api_base}/channels/{self.channel.id}/messages/{self.id}/crosspost",
+        )
+
+
+class RestChannel:
+    """A channel posted to through DiscordRest, in place of discord.py's.
+
+    Has what the send path uses: send(), typing(), is_news() and ``guild``
+    (whose roles _compile_tag reads).  The channel's type and its guild's
+    roles are read on first use and again every REST_INFO_TTL seconds; see
+    refresh().  Made by DiscordRest.channel().
+    """
+
+    def __init__(self, rest, channel_id):
+        self.rest = rest
+        self.id = channel_id
+        self.type = None
+        self.guild = rest.guild(None)
+        self.loaded = None  # monotonic
+
+    async def refresh(self):
+        """Re-read the channel and its guild's roles if they're out of date.
+
+        Failures are logged, and what's known is kept.  Called by
+        poll_source() before rendering, and before each send.
+        """
+        try:
+            if self.loaded is None or time.monotonic() - self.loaded >= REST_INFO_TTL:
+                await self._load()
+                self.loaded = time.monotonic()
+            await self.guild.refresh(self.rest)
+        except (
+            discord.errors.HTTPException,
+            discord.errors.RateLimited,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+        ) as e:
+            logger.warning(
+                "discord:channel %s: could not read its details: %s", self, e
+            )
+
+    async def _load(self):
+        info = await self.rest.request("GET", "/channels/{id}", self.id)
+        self.type = info.get("type")
+        self.guild = self.rest.guild(info.get("guild_id"))
+
+    def is_news(self):
+        return self.type == DISCORD_NEWS_CHANNEL
+
+    async def typing(self):
+        await self.rest.request("POST", "/channels/{id}/typing", self.id)
+
+    async def send(self, content):
+        await self.refresh()
+        message = await self.rest.request(
+            "POST", "/channels/{id}/messages", self.id, json={"content": content}
+        )
+        return _RestMessage(self, message["id"])
+
+    def __str__(self):
+        return str(self.id)
+
+
+class WebhookChannel(RestChannel):
+    """A channel posted to through one of its webhooks ([WEBHOOKS]).
+
+    Needs no bot token.  Typing isn't possible and webhook posts aren't
+    published; @field role mentions work if there's a bot token to read the
+    guild's roles with.
+    """
+
+    def __init__(self, rest, url):
+        super().__init__(rest, None)
+        self.url = url.split("?", 1)[0]
+        # The webhook id is the route's major parameter.
+        self.webhook_id = _webhook_id(self.url)
+
+    async def _load(self):
+        info = await self.rest.request(
+            "GET", "/webhooks/{id}", self.webhook_id, url=self.url, auth=False
+        )
+        self.id = info.get("channel_id")
+        self.guild = self.rest.guild(info.get("guild_id"))
+
+    def is_news(self):
+        return False
+
+    async def typing(self):
+        pass
+
+    async def send(self, content):
+        await self.refresh()
+        message = await self.rest.request(
+            "POST",
+            "/webhooks/{id}",
+            self.webhook_id,
+            url=self.url + "?wait=true",
+            json={"content": content},
+            auth=False,
+        )
+        return _RestMessage(self, message["id"])
+
+    def __str__(self):
+        return "webhook " + self.webhook_id
+
+
+# Created on demand by get_discord_rest().
+_discord_rest = None
+
+
+def get_discord_rest():
+    """Return the process-wide DiscordRest, creating it on first use.
+
+    Uses [MAIN] login_token and discord_api (default Discord's v10 API).
+    Called by _channel_object() and PollScheduler.run().
+    """
+    global _discord_rest
+    if _discord_rest is None:
+        _discord_rest = DiscordRest(
+            MAIN.get("discord_api", "https://discord.com/api/v10"),
+            MAIN.get("login_token"),
+        )
+    return _discord_rest
+
+
+# Entry date fields, most preferred first.  Called by item_date().
+ITEM_DATE_FIELDS = ("published", "pubDate", "date", "created", "updated", "expiry")
+
+
+def item_date(item, tzinfo):
+    """Return the best date for a feed item as a UTC-aware datetime, or None. Called by poll_source()."""
+    for date_field in ITEM_DATE_FIELDS:
         if item.get(date_field):
             # Prefer feedparser's pre-parsed struct_time: it resolves named
             # zones (EST/EDT/PST/...) that dateutil can't, and is already UTC.
@@ -476,14 +1538,14 @@ def extract_best_item_date(item, tzinfo):
             except Exception:
                 pass
 
-    # No potentials found, default to "now" in UTC
-    return datetime.now(timezone.utc)
+    # No potentials found; poll_source() uses "now"
+    return None
 
 
-async def maybe_send_typing(FEED, feed, channels):
-    """Send a typing indicator to each channel if send_typing is enabled. Returns None. Called by background_check_feed() and actually_send_message()."""
-    send_typing = FEED.getint("%s.send_typing" % feed, FEED.getint("send_typing", 0))
-    if feed in typing_disabled or not send_typing:
+async def maybe_send_typing(settings, channels):
+    """Send a typing indicator to each channel if send_typing is enabled. Returns None. Called by poll_source() and actually_send_message()."""
+    feed = settings.name
+    if feed in typing_disabled or not settings.send_typing:
         return
     for channel in channels:
         try:
@@ -514,7 +1576,7 @@ def _truncate_paragraphs(text, max_paras):
 
     max_paras <= 0 means no limit (return text unchanged).  Used to keep only the
     lead of a long multi-paragraph body field (per-feed `max_paragraphs`).  Called
-    by the body _field_* handlers after HTML->markdown rendering, while paragraph
+    by the body field renderers after HTML->markdown rendering, while paragraph
     breaks are still doubled newlines (build_message squashes them afterward).
     """
     if max_paras <= 0:
@@ -534,7 +1596,7 @@ def _trim_leading_noise(text):
     image paragraph renders empty and an <hr> renders as ``* * *``.  Such leading
     paragraphs are always noise, so they're skipped (no per-feed config) up to the
     first paragraph with real content.  Interior rules and separators are kept.
-    Called by the body _field_* handlers before `_truncate_paragraphs`.
+    Called by the body field renderers before `_truncate_paragraphs`.
     """
     paras = re.split(r"\n\s*\n", text)
     i = 0
@@ -546,127 +1608,217 @@ def _trim_leading_noise(text):
     return "\n\n".join(paras[i:])
 
 
-def _field_highlight(m, item, FEED):
-    """Return a field value wrapped in markup delimiters (bold, italic, spoiler, etc.). Called by process_field()."""
+def _compile_body(settings):
+    """Return a function rendering a body field's HTML as trimmed Markdown.
+
+    Uses the feed's skip_elements, max_paragraphs, wrap_urls and
+    render_engine settings.  The result is memoized in the item's render
+    memo under the field name plus those settings, so a body shared by
+    several channels, sections or a filter is converted only once.  Used by
+    the quote and plain renderers.
+    """
+    skip_elements = settings.skip_elements
+    max_paragraphs = settings.max_paragraphs
+    wrap_urls = settings.wrap_urls
+    engine = settings.render_engine
+
+    def render_body(field, value, memo):
+        key = (field, skip_elements, max_paragraphs, wrap_urls, engine)
+        rendered = memo.get(key)
+        if rendered is None:
+            value = feedfields.strip_html_elements(value, skip_elements)
+            rendered = feedfields.render_text_field(value, engine)
+            rendered = _trim_leading_noise(rendered)
+            rendered = _truncate_paragraphs(rendered, max_paragraphs)
+            if wrap_urls:
+                rendered = feedfields.wrap_bare_urls(rendered)
+            memo[key] = rendered
+        return rendered
+
+    return render_body
+
+
+def _compile_link(settings, begin="", end=""):
+    """Render the item's link resolved against feed_url, wrapped in begin/end."""
+    feed_url = settings.feed_url
+
+    def render(item, channel, memo):
+        if item.get("link") is not None:
+            return begin + urljoin(feed_url, item["link"]) + end
+        logger.error("field:link:no such field")
+        return ""
+
+    return render
+
+
+def _compile_highlight(m, settings):
+    """Wrap a field value in markup delimiters (bold, italic, spoiler, etc.)."""
     begin, field, end = m.groups()
     if field == "link":
-        if item.get("link") is not None:
-            return begin + urljoin(FEED.get("feed_url"), item["link"]) + end
-        logger.error("process_field:%s:no such field", field)
+        return _compile_link(settings, begin, end)
+
+    def render(item, channel, memo):
+        value = feedfields.resolve_field(item, field)
+        if value is not None:
+            return begin + html.unescape(value) + end
+        logger.error("field:%s:no such field", field)
         return ""
-    value = feedfields.resolve_field(item, field)
-    if value is not None:
-        return begin + html.unescape(value) + end
-    logger.error("process_field:%s:no such field", field)
-    return ""
 
+    return render
+
+
+_RE_HTML_TAG = re.compile("<[^<]+?>")
 
-def _field_header(m, item):
-    """Return a Markdown heading line (## / ### / etc.) from a field value. Called by process_field()."""
+
+def _compile_header(m, settings):
+    """Render a Markdown heading line (## / ### / etc.) from a field's first line."""
     prefix, field = m.group(1), m.group(2)
-    value = feedfields.resolve_field(item, field)
-    if value is not None:
-        content = re.sub("<[^<]+?>", "", html.unescape(value))
-        content = content.splitlines()[0].strip() if content.strip() else ""
-        return prefix + " " + content if content else ""
-    logger.error("process_field:%s:no such field", field)
-    return ""
+
+    def render(item, channel, memo):
+        value = feedfields.resolve_field(item, field)
+        if value is not None:
+            content = _RE_HTML_TAG.sub("", html.unescape(value))
+            content = content.splitlines()[0].strip() if content.strip() else ""
+            return prefix + " " + content if content else ""
+        logger.error("field:%s:no such field", field)
+        return ""
+
+    return render
 
 
-def _field_bigcode(m, item):
-    """Return a field value wrapped in a triple-backtick code block. Called by process_field()."""
+def _compile_bigcode(m, settings):
+    """Wrap a field value in a triple-backtick code block."""
     field = m.group(1)
-    value = feedfields.resolve_field(item, field)
-    if value is not None:
-        return "```\n%s\n```" % html.unescape(value)
-    logger.error("process_field:%s:no such field", field)
-    return ""
 
+    def render(item, channel, memo):
+        value = feedfields.resolve_field(item, field)
+        if value is not None:
+            return "```\n%s\n```" % html.unescape(value)
+        logger.error("field:%s:no such field", field)
+        return ""
+
+    return render
 
-def _field_quote(m, item, FEED):
-    """Return a field's HTML-to-markdown content as Discord blockquote lines (> …). Called by process_field()."""
+
+def _compile_quote(m, settings):
+    """Render a field's HTML-to-markdown content as Discord blockquote lines (> …)."""
     field = m.group(1)
-    value = feedfields.resolve_field(item, field)
-    if value is not None:
-        value = feedfields.strip_html_elements(value, FEED.get("skip_elements", ""))
-        content = feedfields.render_text_field(value)
-        content = _trim_leading_noise(content)
-        content = _truncate_paragraphs(content, FEED.getint("max_paragraphs", 0))
-        if FEED.getboolean("wrap_urls", True):
-            content = feedfields.wrap_bare_urls(content)
-        return "\n".join("> " + ln for ln in content.splitlines())
-    logger.error("process_field:%s:no such field", field)
-    return ""
-
-
-def _field_code(m, item):
-    """Return a field value wrapped in backtick inline code. Called by process_field()."""
+    render_body = _compile_body(settings)
+
+    def render(item, channel, memo):
+        value = feedfields.resolve_field(item, field)
+        if value is not None:
+            content = render_body(field, value, memo)
+            return "\n".join("> " + ln for ln in content.splitlines())
+        logger.error("field:%s:no such field", field)
+        return ""
+
+    return render
+
+
+def _compile_code(m, settings):
+    """Wrap a field value in backtick inline code."""
     field = m.group(1)
-    value = feedfields.resolve_field(item, field)
-    if value is not None:
-        return "`%s`" % html.unescape(value)
-    logger.error("process_field:%s:no such field", field)
-    return ""
+
+    def render(item, channel, memo):
+        value = feedfields.resolve_field(item, field)
+        if value is not None:
+            return "`%s`" % html.unescape(value)
+        logger.error("field:%s:no such field", field)
+        return ""
+
+    return render
+
+
+def guild_role_ids(guild):
+    """Return the guild's {role name: role id}, indexing its roles on first use.
+
+    When several roles share a name, the first in ``guild.roles`` wins, as it
+    did when each tag was compared against every role in turn.  Called by
+    _compile_tag()'s renderer.
+    """
+    role_ids = _guild_role_ids.get(guild.id)
+    if role_ids is None:
+        role_ids = {}
+        for role in guild.roles:
+            role_ids.setdefault(str(role.name), role.id)
+        _guild_role_ids[guild.id] = role_ids
+    return role_ids
 
 
-def _field_tag(m, item, channel):
-    """Return a comma-separated tag list with matching guild roles replaced by @-mentions. Called by process_field()."""
+def _compile_tag(m, settings):
+    """Render a comma-separated tag list, with matching guild roles as @-mentions."""
     field = m.group(1)
-    if item.get(field) is not None:
-        taglist = item[field].split(", ")
-        for role in channel["object"].guild.roles:
-            rn = str(role.name)
-            taglist = ["<@&%s>" % role.id if rn == str(i) else i for i in taglist]
-        return ", ".join(taglist)
-    logger.error("process_field:%s:no such field", field)
-    return ""
+
+    def render(item, channel, memo):
+        if item.get(field) is not None:
+            role_ids = guild_role_ids(channel["object"].guild)
+            return ", ".join(
+                "<@&%s>" % role_ids[tag] if tag in role_ids else tag
+                for tag in item[field].split(", ")
+            )
+        logger.error("field:%s:no such field", field)
+        return ""
+
+    return render
 
 
-def _field_dict(m, item):
-    """Return a sub-key from a dict-like field, joined by the configured delimiter.
+def _compile_dict(m, settings):
+    """Render a sub-key from a dict-like field, joined by the configured delimiter.
 
     ``[delim]field.key`` -- for a list base (enclosures, links, tags) join key
     from every element with delim; for a single dict-like base (itunes) return
     the one key.  Uses .get() so a missing key is skipped, not an error.
-    Called by process_field().
     """
     delim, field, dictkey = m.group(1), m.group(2), m.group(3)
-    obj = item.get(field)
-    if obj is None:
-        logger.error("process_field:%s:no such field", field)
+
+    def render(item, channel, memo):
+        obj = item.get(field)
+        if obj is None:
+            logger.error("field:%s:no such field", field)
+            return ""
+        if isinstance(obj, list):
+            parts = [
+                str(x.get(dictkey))
+                for x in obj
+                if hasattr(x, "get") and x.get(dictkey) is not None
+            ]
+            return delim.join(parts)
+        if hasattr(obj, "get"):
+            value = obj.get(dictkey)
+            return "" if value is None else str(value)
+        logger.error("field:%s:not a dict-like field", field)
         return ""
-    if isinstance(obj, list):
-        parts = [
-            str(x.get(dictkey))
-            for x in obj
-            if hasattr(x, "get") and x.get(dictkey) is not None
-        ]
-        return delim.join(parts)
-    if hasattr(obj, "get"):
-        value = obj.get(dictkey)
-        return "" if value is None else str(value)
-    logger.error("process_field:%s:not a dict-like field", field)
-    return ""
-
-
-def _field_plain(field, item, FEED):
-    """Return a bare field value converted from HTML to Markdown. Called by process_field()."""
+
+    return render
+
+
+def _compile_plain(field, settings):
+    """Render a bare field value converted from HTML to Markdown."""
     if field == "link":
-        if item.get("link") is not None:
-            return urljoin(FEED.get("feed_url"), item["link"])
-        logger.error("process_field:%s:no such field", field)
+        return _compile_link(settings)
+    render_body = _compile_body(settings)
+
+    def render(item, channel, memo):
+        value = feedfields.resolve_field(item, field)
+        if value is not None:
+            return render_body(field, value, memo)
+        logger.error("field:%s:no such field", field)
+        return ""
+
+    return render
+
+
+def _compile_guid(item_url_base):
+    """Render the item's guid appended to the feed's item_url_base."""
+
+    def render(item, channel, memo):
+        if item.get("guid") is not None:
+            return item_url_base + item["guid"]
+        logger.error("field:guid:no such field; try show_sample_entry.py on feed")
         return ""
-    value = feedfields.resolve_field(item, field)
-    if value is not None:
-        value = feedfields.strip_html_elements(value, FEED.get("skip_elements", ""))
-        rendered = feedfields.render_text_field(value)
-        rendered = _trim_leading_noise(rendered)
-        rendered = _truncate_paragraphs(rendered, FEED.getint("max_paragraphs", 0))
-        if FEED.getboolean("wrap_urls", True):
-            rendered = feedfields.wrap_bare_urls(rendered)
-        return rendered
-    logger.error("process_field:%s:no such field", field)
-    return ""
+
+    return render
 
 
 _RE_STRING = re.compile(r'^"(.+?)"$')
@@ -678,38 +1830,172 @@ _RE_CODE = re.compile(r"^`(.+)`$")
 _RE_TAG = re.compile(r"^@(.+)$")
 _RE_DICT = re.compile(r"^\[(.+)\](.+)\.(.+)$")
 
+# Field spec forms after "quoted literal", tried in order; the first match wins.
+_FIELD_COMPILERS = (
+    (_RE_HIGHLIGHT, _compile_highlight),
+    (_RE_HEADER, _compile_header),
+    (_RE_BIGCODE, _compile_bigcode),
+    (_RE_QUOTE, _compile_quote),
+    (_RE_CODE, _compile_code),
+    (_RE_TAG, _compile_tag),
+    (_RE_DICT, _compile_dict),
+)
 
-def process_field(field, item, FEED, channel):
-    """Render one field spec to a string. Returns str. Called by build_message() and _apply_channel_filter()."""
-    logger.trace("%s:process_field:%s: started", FEED, field)
 
-    item_url_base = FEED.get("item_url_base", None)
-    if field == "guid" and item_url_base is not None:
-        if item.get("guid") is not None:
-            return item_url_base + item["guid"]
-        else:
-            logger.error(
-                "process_field:guid:no such field; try show_sample_entry.py on feed"
-            )
-            return ""
+def compile_field(field, settings):
+    """Compile one field spec into a ``render(item, channel, memo) -> str`` function.
 
+    Works out once which form the spec takes and picks up the feed settings
+    it needs, so rendering an item is only data access and formatting.  ``memo``
+    is a dict shared by every render of one item (see _compile_body).  Called
+    by RenderPlan.
+    """
+    item_url_base = settings.item_url_base
+    if field == "guid" and item_url_base is not None:
+        return _compile_guid(item_url_base)
     if m := _RE_STRING.match(field):
-        return m.group(1)
-    if m := _RE_HIGHLIGHT.match(field):
-        return _field_highlight(m, item, FEED)
-    if m := _RE_HEADER.match(field):
-        return _field_header(m, item)
-    if m := _RE_BIGCODE.match(field):
-        return _field_bigcode(m, item)
-    if m := _RE_QUOTE.match(field):
-        return _field_quote(m, item, FEED)
-    if m := _RE_CODE.match(field):
-        return _field_code(m, item)
-    if m := _RE_TAG.match(field):
-        return _field_tag(m, item, channel)
-    if m := _RE_DICT.match(field):
-        return _field_dict(m, item)
-    return _field_plain(field, item, FEED)
+        literal = m.group(1)
+        return lambda item, channel, memo: literal
+    for regex, compiler in _FIELD_COMPILERS:
+        if m := regex.match(field):
+            return compiler(m, settings)
+    return _compile_plain(field, settings)
+
+
+# A bare or dotted field name, which filter_match = raw/text can read directly.
+_RE_FIELD_NAME = re.compile(r"^[A-Za-z_][\w:.-]*$")
+
+# filter_match option values.
+FILTER_MATCH_MODES = ("rendered", "raw", "text")
+
+
+def _plain_text(value):
+    """Return HTML as plain text: tags removed, entities decoded, spaces collapsed."""
+    return " ".join(html.unescape(_RE_HTML_TAG.sub(" ", value)).split())
+
+
+class ChannelFilter:
+    """One channel's ``filter`` or ``filter_exclude``, ready to run.
+
+    ``filter_match`` picks the text the pattern is searched in: ``rendered``
+    (the default) renders filter_field like a message field, HTML converted
+    to Markdown; ``raw`` is a bare or dotted field's value as the feed sent
+    it, and ``text`` that value as plain text -- both skip the conversion, so
+    filtering a long body stays cheap.  Other field specs (``[|]tags.term``,
+    ``**title**``) are always rendered.
+
+    Results are kept in the item's render memo under the section, field,
+    mode and pattern, so channels sharing a filter (a feed-wide ``filter``
+    fanned out to many channels) search each item once.
+    """
+
+    def __init__(self, settings, channel):
+        self.exclude = channel.filter_exclude
+        self.pattern = channel.filter.pattern
+        self.regex = channel.filter
+        self.field = channel.filter_field
+        mode = channel.filter_match
+        if mode != "rendered" and not _RE_FIELD_NAME.match(self.field):
+            mode = "rendered"
+        self.mode = mode
+        if mode == "rendered":
+            self.value = compile_field(self.field, settings)
+        else:
+            self.value = self._field_value
+        # Tag mentions depend on the channel's guild, so only those aren't shared.
+        if mode == "rendered" and _RE_TAG.match(self.field):
+            self.key = None
+        else:
+            self.key = ("filter", settings.name, self.field, mode, self.pattern)
+
+    def _field_value(self, item, channel, memo):
+        value = feedfields.resolve_field(item, self.field)
+        if value is None:
+            logger.error("field:%s:no such field", self.field)
+            return ""
+        if self.mode == "raw":
+            return value
+        key = ("text", self.field)
+        text = memo.get(key)
+        if text is None:
+            text = memo[key] = _plain_text(value)
+        return text
+
+    def matches(self, item, channel, memo):
+        """Return True if the pattern is found in the item's filter text."""
+        if self.key is not None and self.key in memo:
+            return memo[self.key]
+        matched = self.regex.search(self.value(item, channel, memo)) is not None
+        if self.key is not None:
+            memo[self.key] = matched
+        return matched
+
+
+class RenderPlan:
+    """One feed section's compiled ``fields`` and filter for one channel.
+
+    Built from the feed's FeedSettings and the channel's ChannelSettings when
+    the section's channels are resolved; stored as the channel dict's
+    ``plan``.  ``filter`` is a ChannelFilter, or None when the channel has no
+    filter; ``digest`` holds the compiled ``digest_fields`` (empty unless the
+    channel has a digest_threshold).  Used by build_message(),
+    build_digest_line() and _apply_channel_filter().
+    """
+
+    def __init__(self, settings, channel):
+        self.fields = [compile_field(field, settings) for field in channel.fields]
+        self.digest = []
+        if channel.digest_threshold > 0:
+            self.digest = [
+                compile_field(field, settings) for field in channel.digest_fields
+            ]
+        self.filter = None
+        if channel.filter is not None:
+            self.filter = ChannelFilter(settings, channel)
+
+
+def _field_entry_key(field):
+    """Return the top-level entry key a field spec reads, or None for a literal.
+
+    Mirrors compile_field()'s dispatch: ``**title**`` and ``##title`` read
+    ``title``, ``itunes.duration`` reads ``itunes``.  Called by _entry_keys().
+    """
+    if _RE_STRING.match(field):
+        return None
+    for regex, group in (
+        (_RE_HIGHLIGHT, 2),
+        (_RE_HEADER, 2),
+        (_RE_BIGCODE, 1),
+        (_RE_QUOTE, 1),
+        (_RE_CODE, 1),
+        (_RE_TAG, 1),
+        (_RE_DICT, 2),
+    ):
+        if m := regex.match(field):
+            field = m.group(group)
+            break
+    return field.split(".", 1)[0]
+
+
+def _entry_keys(sections):
+    """Return every entry key the given sections' FeedSettings can read.
+
+    That is the keys behind their channels' fields and filter_field specs,
+    plus what ids, dates and log lines use.  Called by FeedSource.
+    """
+    keys = {"id", "guid", "link", "title"}
+    for date_field in ITEM_DATE_FIELDS:
+        keys.update((date_field, date_field + "_parsed"))
+    for settings in sections:
+        for channel in settings.channels:
+            specs = channel.fields + (channel.filter_field,)
+            if channel.digest_threshold > 0:
+                specs += channel.digest_fields
+            for field in specs:
+                key = _field_entry_key(field.strip())
+                if key:
+                    keys.add(key)
+    return frozenset(keys)
 
 
 # Discord's hard per-message limit is 2000 characters; keep some headroom.
@@ -747,16 +2033,18 @@ def _split_message(text, limit=MESSAGE_CHUNK_LIMIT):
     return chunks
 
 
-def build_message(FEED, item, channel):
-    """Build the full Discord message string for an item. Called by _collect_item_sends()."""
-    message = ""
-    fieldlist = FEED.get(
-        channel["name"] + ".fields", FEED.get("fields", "id,description")
-    ).split(",")
-    # Extract fields in order
-    for field in fieldlist:
-        logger.trace("feed:item:build_message:%s:added to message", field)
-        message += process_field(field, item, FEED, channel) + "\n"
+def build_message(settings, item, channel, memo=None):
+    """Build the full Discord message string for an item. Called by _build_sends().
+
+    ``memo`` is the item's render memo; pass the same dict for every channel
+    so shared fields are rendered once.
+    """
+    if memo is None:
+        memo = {}
+    # Render fields in order, through the channel's precompiled RenderPlan
+    message = "".join(
+        render(item, channel, memo) + "\n" for render in channel["plan"].fields
+    )
 
     # Naked spaces are terrible:
     message = re.sub(r"(?<!>) +\n", "\n", message)
@@ -768,45 +2056,298 @@ def build_message(FEED, item, channel):
     return message
 
 
-async def _send_channel_batches(sends_by_channel, feed, FEED):
-    """Send each channel's queued messages in chronological order.
+def build_digest_line(item, channel, memo):
+    """Build an item's one-line ``- ...`` entry in a digest. Called by _build_sends().
 
-    sends_by_channel maps a channel name to a list of (channel, message) tuples
-    already ordered oldest-first.  Messages go out one at a time, awaited, with
-    send_interval seconds between consecutive messages in the same channel so the
-    order Discord shows matches the order sent.  The per-channel `delay` (if any)
-    is applied once as an initial offset before that channel's first message.
-    Channels are handled one after another.  Called by background_check_feed().
+    The channel's digest_fields are rendered like ``fields`` but joined with
+    spaces, and any line breaks inside them become spaces too.
     """
-    for channel_name, messages in sends_by_channel.items():
-        if not messages:
+    parts = (render(item, channel, memo).strip() for render in channel["plan"].digest)
+    return "- " + _RE_LINE_BREAKS.sub(" ", " ".join(part for part in parts if part))
+
+
+# Line breaks and the spaces around them, squashed by build_digest_line().
+_RE_LINE_BREAKS = re.compile(r"\s*\n\s*")
+
+
+class OutboxMessage:
+    """One rendered message for one channel, kept in the outbox until sent.
+
+    ``id`` is its outbox row, and so its place in the send order;
+    ``channel`` is the section's channel dict.  ``not_before`` (epoch
+    seconds) applies the channel's ``delay``.  ``parts_sent`` counts the
+    parts of a long message already out, so a retry carries on from the next
+    one.
+    """
+
+    __slots__ = (
+        "attempts",
+        "channel",
+        "id",
+        "message",
+        "not_before",
+        "parts_sent",
+        "settings",
+    )
+
+    def __init__(self, settings, channel, message, not_before=None):
+        self.id = None
+        self.settings = settings
+        self.channel = channel
+        self.message = message
+        if not_before is None:
+            not_before = time.time() + channel["settings"].delay
+        self.not_before = not_before
+        self.attempts = 0
+        self.parts_sent = 0
+
+
+def _outbox_add(conn, messages):
+    """Write new OutboxMessages to the outbox, setting their ids. Called by poll_source()."""
+    for entry in messages:
+        entry.id = conn.execute(
+            "INSERT INTO outbox (feed,channel,channel_id,message,not_before) "
+            "VALUES (?,?,?,?,?)",
+            (
+                entry.settings.name,
+                entry.channel["name"],
+                entry.channel["key"],
+                entry.message,
+                entry.not_before,
+            ),
+        ).lastrowid
+
+
+def _outbox_remove(conn, row_ids):
+    """Delete sent (or abandoned) messages from the outbox."""
+    conn.executemany("DELETE FROM outbox WHERE id=?", [(i,) for i in row_ids])
+
+
+def _outbox_retry(conn, entry):
+    """Record a failed attempt at sending entry, and when to try again."""
+    conn.execute(
+        "UPDATE outbox SET attempts=?, parts_sent=?, not_before=? WHERE id=?",
+        (entry.attempts, entry.parts_sent, entry.not_before, entry.id),
+    )
+
+
+def _load_outbox(conn):
+    """Return every outbox row, in send order. Called by replay_outbox()."""
+    return conn.execute(
+        "SELECT id,feed,channel,message,not_before,attempts,parts_sent "
+        "FROM outbox ORDER BY id"
+    ).fetchall()
+
+
+# A send that fails for a reason that may pass (network trouble, a Discord
+# server error or rate limit) is retried OUTBOX_RETRY_MIN seconds later,
+# doubling each time, until the message has had OUTBOX_MAX_ATTEMPTS tries.
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_MIN = 30
+
+
+class ChannelQueue:
+    """Outgoing messages for one Discord channel, sent in order by its own task.
+
+    Feeds queue their messages here (already saved in the outbox) and return
+    at once, so a long ``delay`` or ``send_interval`` only holds up this
+    channel -- not the feed's other channels, its next poll, or other feeds
+    -- and different channels send in parallel.  Messages go out one at a
+    time in outbox order (so oldest-first within a poll, and polls in order),
+    each no sooner than its ``not_before`` and ``send_interval`` seconds
+    after the previous message sent here, and leave the outbox once sent.  A
+    message to be retried stays at the front, holding back the ones behind
+    it.  The sending task is started when messages arrive and ends once the
+    queue is empty.
+
+    Discord's rate limits are per route, i.e. per channel for sends: while
+    discord.py waits out a channel's limit only that channel's task waits,
+    and a send it gives up on (RateLimited) is retried here.
+    """
+
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+        self.pending = collections.deque()  # OutboxMessages
+        self.last_sent = None  # monotonic time the previous message went out
+        self.task = None
+
+    def put(self, entry):
+        """Queue an OutboxMessage, starting the sender if idle."""
+        self.pending.append(entry)
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        db = get_feed_db()
+        try:
+            while self.pending:
+                entry = self.pending[0]
+                wait = entry.not_before - time.time()
+                interval = entry.channel["settings"].send_interval
+                if self.last_sent is not None and interval > 0:
+                    wait = max(wait, self.last_sent + interval - time.monotonic())
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                done = await _send_outbox_message(entry)
+                self.last_sent = time.monotonic()
+                if done:
+                    self.pending.popleft()
+                else:
+                    entry.not_before = time.time() + OUTBOX_RETRY_MIN * 2 ** (
+                        entry.attempts - 1
+                    )
+                try:
+                    if done:
+                        await db.run(_outbox_remove, [entry.id])
+                    else:
+                        await db.run(_outbox_retry, entry)
+                    db.commit_soon()
+                except sqlite3.Error:
+                    logger.exception("%s:outbox update failed", self.channel_id)
+        finally:
+            self.task = None
+
+
+# ChannelQueues by channel key (see ChannelSettings), created on demand by
+# get_channel_queue().
+channel_queues = {}
+
+
+def get_channel_queue(channel_id):
+    """Return the ChannelQueue for a Discord channel id. Called by queue_messages()."""
+    queue = channel_queues.get(channel_id)
+    if queue is None:
+        queue = channel_queues[channel_id] = ChannelQueue(channel_id)
+    return queue
+
+
+def queue_messages(messages):
+    """Hand OutboxMessages, in outbox order, to their channels' ChannelQueues.
+
+    Returns at once; each channel sends its own queue.  Called by
+    PollScheduler and replay_outbox().
+    """
+    for entry in messages:
+        get_channel_queue(entry.channel["key"]).put(entry)
+
+
+async def replay_outbox(sources):
+    """Queue the messages a previous run left unsent. Called by PollScheduler.run().
+
+    Messages for a feed section or channel that is no longer configured (or
+    that Discord doesn't know) are dropped.
+    """
+    db = get_feed_db()
+    sections = {
+        section.feed: section for source in sources for section in source.sections
+    }
+    replayed = []
+    dropped = []
+    for row in await db.run(_load_outbox):
+        row_id, feed, channel_name, message, not_before, attempts, parts_sent = row
+        section = sections.get(feed)
+        channel = None
+        if section is not None:
+            for candidate in section.get_channels():
+                if candidate["name"] == channel_name:
+                    channel = candidate
+        if channel is None:
+            dropped.append(row_id)
             continue
-        delay = FEED.getint(channel_name + ".delay", FEED.getint("delay", 0))
-        interval = FEED.getint(
-            channel_name + ".send_interval", FEED.getint("send_interval", 3)
+        entry = OutboxMessage(section.settings, channel, message, not_before)
+        entry.id = row_id
+        entry.attempts = attempts
+        entry.parts_sent = parts_sent
+        replayed.append(entry)
+    if dropped:
+        logger.warning(
+            "dropping %d unsent message(s) for feeds/channels no longer configured",
+            len(dropped),
         )
-        logger.debug(
-            "%s:%s:sending %d message(s), delay=%ds interval=%ds",
+        await db.run(_outbox_remove, dropped)
+    if replayed:
+        logger.notice("resending %d message(s) left unsent last run", len(replayed))
+        queue_messages(replayed)
+
+
+async def _send_outbox_message(entry):
+    """Send one queued message; return False if it failed but should be retried.
+
+    Failures are logged here.  Network trouble, Discord server errors and
+    rate limits count an attempt (see OUTBOX_MAX_ATTEMPTS); anything else --
+    e.g. no permission in the channel -- drops the message.  Called by
+    ChannelQueue.
+    """
+    feed = entry.settings.name
+    name = entry.channel["name"]
+    try:
+        await actually_send_message(entry)
+        return True
+    # Ideally we'd remove the specific channel or something...
+    # But I guess just throw an error into the log and carry on...
+    except discord.errors.Forbidden:
+        logger.error(
+            "%s:%s:discord.errors.Forbidden — bot may lack permission in channel",
             feed,
-            channel_name,
-            len(messages),
-            delay,
-            interval,
+            name,
         )
-        if delay > 0:
-            await asyncio.sleep(delay)
-        for i, (channel, message) in enumerate(messages):
-            if i > 0 and interval > 0:
-                await asyncio.sleep(interval)
-            await actually_send_message(channel, message, FEED, feed)
+        logger.trace("%s:exc_info: %s", feed, sys.exc_info())
+        return True
+    except (
+        aiohttp.ClientError,
+        asyncio.TimeoutError,
+        discord.errors.DiscordServerError,
+        discord.errors.RateLimited,
+    ) as err:
+        problem = type(err).__name__
+    except Exception:
+        logger.exception("%s:%s:Unexpected error while sending", feed, name)
+        return True
+    entry.attempts += 1
+    if entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+        logger.error(
+            "%s:%s:%s while sending; giving up after %d attempts",
+            feed,
+            name,
+            problem,
+            entry.attempts,
+        )
+        return True
+    logger.warning("%s:%s:%s while sending; will retry", feed, name, problem)
+    return False
 
 
-async def actually_send_message(channel, message, FEED, feed):
-    """Send one message to Discord, splitting long output into multiple messages
-    and publishing if configured. Called by _send_channel_batches()."""
-    await maybe_send_typing(FEED, feed, [channel])
+# Tries per message part when Discord answers RateLimited (see _send_part()).
+SEND_RATE_LIMIT_TRIES = 3
 
-    chunks = _split_message(message)
+
+async def _send_part(channel, body, feed):
+    """Send one message part, waiting out and retrying a RateLimited answer."""
+    for attempt in range(1, SEND_RATE_LIMIT_TRIES + 1):
+        try:
+            return await channel["object"].send(body)
+        except discord.errors.RateLimited as limited:
+            if attempt == SEND_RATE_LIMIT_TRIES:
+                raise
+            logger.warning(
+                "%s:%s:rate-limited by Discord; retrying in %.1f seconds",
+                feed,
+                channel["name"],
+                limited.retry_after,
+            )
+            await asyncio.sleep(limited.retry_after)
+
+
+async def actually_send_message(entry):
+    """Send one OutboxMessage to Discord, splitting long output into multiple
+    messages (skipping parts already sent) and publishing if configured.
+    Called by _send_outbox_message()."""
+    channel = entry.channel
+    settings = entry.settings
+    feed = settings.name
+    await maybe_send_typing(settings, [channel])
+
+    chunks = _split_message(entry.message)
     if not chunks:
         logger.debug("%s:%s:empty message, nothing to send", feed, channel["name"])
         return
@@ -814,24 +2355,20 @@ async def actually_send_message(channel, message, FEED, feed):
     # max_messages caps how many Discord messages one item may produce.  0 (the
     # default) means unlimited; a positive value keeps the first N chunks and
     # marks the last as truncated.  Per-feed and per-channel overridable.
-    max_messages = FEED.getint(
-        channel["name"] + ".max_messages", FEED.getint("max_messages", 0)
-    )
+    max_messages = channel["settings"].max_messages
     truncated = False
     if max_messages > 0 and len(chunks) > max_messages:
         chunks = chunks[:max_messages]
         truncated = True
 
     total = len(chunks)
-    publish = (
-        config["MAIN"].getint("publish", FEED.getint("publish", 0)) >= 1
-        and channel["object"].is_news()
-    )
 
     logger.debug(
         "%s:%s:actually sending message in %d part(s)", feed, channel["name"], total
     )
     for i, chunk in enumerate(chunks):
+        if i < entry.parts_sent:
+            continue
         # Add subtext markers so readers can tell a post was split.
         parts = []
         if i > 0:
@@ -843,18 +2380,17 @@ async def actually_send_message(channel, message, FEED, feed):
             parts.append(POST_TRUNCATED)
         body = "\n".join(parts)
 
-        if i > 0:
+        if i > entry.parts_sent:
             # Small gap between parts so a burst doesn't trip Discord's rate limit.
             await asyncio.sleep(1)
-        msg = await channel["object"].send(body)
+        msg = await _send_part(channel, body, feed)
+        entry.parts_sent = i + 1
 
         # if publish=1, channel is news/announcement and we have manage_messages,
-        # then "publish" so it goes to all servers
-        if publish:
-            try:
-                await msg.publish()
-            except BaseException:
-                logger.warning(feed + ": Could not publish message")
+        # then "publish" so it goes to all servers -- in the background, so
+        # sending carries on without waiting for it.
+        if settings.publish and channel["object"].is_news():
+            get_publish_queue(channel["key"]).put(feed, channel["name"], msg)
 
         logger.debug(
             "%s:%s:message part %d/%d sent: %r",
@@ -866,16 +2402,173 @@ async def actually_send_message(channel, message, FEED, feed):
         )
 
 
-def _resolve_channels(feed, FEED, config, client):
-    """Return a list of channel dicts ({object, name, id}) for a feed's configured channels. Called by background_check_feed()."""
+# A publish that fails for a reason that may pass (network trouble, a Discord
+# server error or rate limit) is tried up to PUBLISH_MAX_ATTEMPTS times,
+# PUBLISH_RETRY_MIN seconds apart, doubling (or as long as Discord asks).
+PUBLISH_MAX_ATTEMPTS = 3
+PUBLISH_RETRY_MIN = 60
+
+# Running totals for every PublishQueue: queued, published, retried, failed,
+# and paced (times a queue waited for the hourly limit).  Logged as queues
+# drain and at shutdown.
+publish_stats = collections.Counter()
+
+
+class PublishQueue:
+    """Posted messages waiting to be published from one announcement channel.
+
+    Sending doesn't wait for publishing (crossposting): actually_send_message()
+    queues each posted part here and carries on, and this queue's own task
+    publishes them in order.  Discord allows only a few publishes per channel
+    per hour -- [MAIN] publish_per_hour, default 10 (0 for no pacing) -- so
+    the task keeps to that itself, and a burst waits its turn here instead of
+    being refused.  A publish refused anyway (RateLimited) or hit by network
+    trouble or a Discord server error is retried (see PUBLISH_MAX_ATTEMPTS);
+    anything else, like missing the Manage Messages permission, is logged and
+    the message left unpublished.
+    """
+
+    def __init__(self, channel_id, per_hour):
+        self.channel_id = channel_id
+        self.per_hour = per_hour
+        self.pending = collections.deque()  # (feed, channel name, message)
+        self.recent = collections.deque()  # monotonic times of recent publishes
+        self.task = None
+
+    def put(self, feed, channel_name, message):
+        """Queue a posted message for publishing, starting the task if idle."""
+        self.pending.append((feed, channel_name, message))
+        publish_stats["queued"] += 1
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            while self.pending:
+                feed, name, message = self.pending[0]
+                await self._wait_turn(feed, name)
+                await self._publish(feed, name, message)
+                self.pending.popleft()
+        finally:
+            self.task = None
+        logger.debug(
+            "channel %s:publish queue empty (%s)", self.channel_id, _publish_totals()
+        )
+
+    async def _wait_turn(self, feed, name):
+        """Wait until publishing again stays within publish_per_hour."""
+        while self.per_hour > 0 and len(self.recent) >= self.per_hour:
+            wait = self.recent[0] + 3600 - time.monotonic()
+            if wait <= 0:
+                self.recent.popleft()
+                continue
+            publish_stats["paced"] += 1
+            logger.info(
+                "%s:%s:hourly publish limit reached; %d message(s) waiting %d seconds",
+                feed,
+                name,
+                len(self.pending),
+                wait,
+            )
+            await asyncio.sleep(wait)
+
+    async def _publish(self, feed, name, message):
+        for attempt in range(1, PUBLISH_MAX_ATTEMPTS + 1):
+            try:
+                await message.publish()
+            except discord.errors.RateLimited as limited:
+                problem, wait = "rate-limited", limited.retry_after
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                discord.errors.DiscordServerError,
+            ) as err:
+                problem = type(err).__name__
+                wait = PUBLISH_RETRY_MIN * 2 ** (attempt - 1)
+            except discord.errors.HTTPException as err:
+                publish_stats["failed"] += 1
+                logger.warning("%s:%s:could not publish message: %s", feed, name, err)
+                return
+            except Exception:
+                publish_stats["failed"] += 1
+                logger.exception("%s:%s:Unexpected error while publishing", feed, name)
+                return
+            else:
+                self.recent.append(time.monotonic())
+                publish_stats["published"] += 1
+                logger.debug("%s:%s:message published", feed, name)
+                return
+            if attempt == PUBLISH_MAX_ATTEMPTS:
+                break
+            publish_stats["retried"] += 1
+            logger.warning(
+                "%s:%s:publish %s; retrying in %d seconds", feed, name, problem, wait
+            )
+            await asyncio.sleep(wait)
+        publish_stats["failed"] += 1
+        logger.error(
+            "%s:%s:publish %s; giving up after %d attempts",
+            feed,
+            name,
+            problem,
+            PUBLISH_MAX_ATTEMPTS,
+        )
+
+
+def _publish_totals():
+    """Return publish_stats as one log-friendly line."""
+    return ", ".join(f"{key} {n}" for key, n in sorted(publish_stats.items()))
+
+
+# PublishQueues by channel key (see ChannelSettings), created on demand by
+# get_publish_queue().
+publish_queues = {}
+
+
+def get_publish_queue(channel_id):
+    """Return the PublishQueue for a channel id. Called by actually_send_message()."""
+    queue = publish_queues.get(channel_id)
+    if queue is None:
+        queue = publish_queues[channel_id] = PublishQueue(
+            channel_id, MAIN.getint("publish_per_hour", 10)
+        )
+    return queue
+
+
+def _channel_object(channel_settings):
+    """Return what to post a channel's messages through, or None if it's unknown.
+
+    A webhook if [WEBHOOKS] has one for it; otherwise the discord.py channel,
+    or with delivery = rest a RestChannel.  Called by _resolve_channels().
+    """
+    if channel_settings.webhook or REST_DELIVERY:
+        if channel_settings.webhook is None and channel_settings.id is None:
+            return None
+        return get_discord_rest().channel(channel_settings)
+    return client.get_channel(channel_settings.id)
+
+
+def _resolve_channels(settings, client):
+    """Return a list of channel dicts ({object, name, id, key, settings, plan}) for a feed's configured channels. Called by poll_source()."""
+    feed = settings.name
     channels = []
-    for key in FEED.get("channels").split(","):
-        channel_id = config["CHANNELS"].getint(key)
+    for channel_settings in settings.channels:
+        key = channel_settings.name
+        channel_id = channel_settings.id
         logger.trace(feed + ": adding channel " + key + ":" + str(channel_id))
-        channel_obj = client.get_channel(channel_id)
+        channel_obj = _channel_object(channel_settings)
         logger.trace(pformat(channel_obj))
         if channel_obj is not None:
-            channels.append({"object": channel_obj, "name": key, "id": channel_id})
+            channels.append(
+                {
+                    "object": channel_obj,
+                    "name": key,
+                    "id": channel_id,
+                    "key": channel_settings.key,
+                    "settings": channel_settings,
+                    "plan": RenderPlan(settings, channel_settings),
+                }
+            )
             logger.trace(feed + ": added channel " + key)
         else:
             logger.warning(
@@ -892,11 +2585,13 @@ def _resolve_channels(feed, FEED, config, client):
 def _load_feed_cache(conn, feed, feed_url):
     """Look up cached etag/lastmodified/hash; register feed row if first-seen.
 
+    Conditional-GET state belongs to the URL, not the section: every section
+    polling feed_url shares the one row, registered under the name `feed`.
     Returns (lastmodified, etag, stored_hash) with None for absent values.
     """
     cursor = conn.execute(
-        "select lastmodified,etag,content_hash from feed_info where feed=? OR url=?",
-        [feed, feed_url],
+        "select lastmodified,etag,content_hash from feed_info where url=?",
+        [feed_url],
     )
     data = cursor.fetchone()
     if data is None:
@@ -924,20 +2619,19 @@ async def _read_feed_response(http_response, feed, stored_hash):
     Returns (http_data, new_hash) on HTTP 200 with changed content.
     Raises HTTPNotModified on 304 or unchanged content hash.
     Raises HTTPError on null status or unexpected non-200 (BACKOFF_STATUSES
-    are handled by the caller so it can update current_refresh).
+    are handled by the caller so it can update current_refresh).  Never closes
+    the response: the caller's ``async with`` releases its connection back to
+    the shared pool for keep-alive reuse.
     """
     logger.trace("%s:%s", feed, http_response)
     if http_response.status is None:
         logger.error(feed + ":HTTP response code is NONE")
-        http_response.close()
         raise HTTPError()
     if http_response.status == 304:
         logger.debug(feed + ":data is old; moving on")
-        http_response.close()
         raise HTTPNotModified()
     if http_response.status != 200:
         logger.warning("%s:unexpected HTTP status %s", feed, http_response.status)
-        http_response.close()
         raise HTTPError()
 
     # HTTP 200 — read and check content hash
@@ -945,19 +2639,36 @@ async def _read_feed_response(http_response, feed, stored_hash):
     logger.trace(feed + ":reading http response")
     http_data = await http_response.read()
 
-    new_hash = hashlib.sha256(http_data).hexdigest()
+    # Hash off the loop: hashlib releases the GIL, so this runs in parallel.
+    new_hash = await asyncio.get_running_loop().run_in_executor(
+        None, feedfields.sha256_hex, http_data
+    )
     if new_hash == stored_hash:
         logger.debug("%s:content hash unchanged; skipping parse", feed)
-        http_response.close()
         raise HTTPNotModified()
 
     return http_data, new_hash
 
 
-def _parse_feed(http_data, feed):
-    """Parse raw feed bytes and log any bozo/empty-entry warnings."""
+async def _parse_feed(http_data, feed, keys=None):
+    """Parse raw feed bytes in the parse pool and log any bozo/empty-entry warnings.
+
+    Returns a feedfields.ParsedFeed.  From a process pool its entries are
+    plain dicts holding just ``keys`` (see _entry_keys), which render the same
+    as feedparser_rs's own objects.
+    """
     logger.trace(feed + ":parsing http data")
-    feed_data = feedparser.parse(http_data)
+    executor = get_parse_executor()
+    if executor is None:
+        feed_data = feedfields.parse_feed_data(http_data)
+    else:
+        feed_data = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            feedfields.parse_feed_data,
+            http_data,
+            isinstance(executor, concurrent.futures.ProcessPoolExecutor),
+            keys,
+        )
     logger.trace(feed + ":done fetching")
     if len(feed_data.entries) == 0:
         if feed_data.bozo or not feed_data.version:
@@ -965,16 +2676,16 @@ def _parse_feed(http_data, feed):
                 "%s:HTTP 200 but parsed 0 entries from %d bytes%s",
                 feed,
                 len(http_data),
-                (" - bozo: %r" % feed_data.bozo_exception) if feed_data.bozo else "",
+                (" - bozo: %s" % feed_data.bozo_exception) if feed_data.bozo else "",
             )
         else:
             logger.debug("%s:feed parsed cleanly but currently has 0 entries", feed)
     elif feed_data.bozo:
         logger.info(
-            "%s:parsed %d entries but feedparser set bozo: %r",
+            "%s:parsed %d entries but feedparser set bozo: %s",
             feed,
             len(feed_data.entries),
-            getattr(feed_data, "bozo_exception", None),
+            feed_data.bozo_exception,
         )
     return feed_data
 
@@ -985,8 +2696,8 @@ def _store_feed_cache(conn, http_response, new_hash, feed, feed_url):
         etag = http_response.headers["ETAG"]
         logger.trace(feed + ":saving etag: " + etag)
         conn.execute(
-            "UPDATE feed_info SET etag=? where feed=? or url=?",
-            [etag, feed, feed_url],
+            "UPDATE feed_info SET etag=? WHERE url=?",
+            [etag, feed_url],
         )
         logger.trace(feed + ":etag saved")
     else:
@@ -995,18 +2706,175 @@ def _store_feed_cache(conn, http_response, new_hash, feed, feed_url):
         modified = http_response.headers["LAST-MODIFIED"]
         logger.trace(feed + ":saving lastmodified: " + modified)
         conn.execute(
-            "UPDATE feed_info SET lastmodified=? where feed=? or url=?",
-            [modified, feed, feed_url],
+            "UPDATE feed_info SET lastmodified=? WHERE url=?",
+            [modified, feed_url],
         )
         logger.trace(feed + ":saved lastmodified")
     else:
         logger.trace(feed + ":no last modified date")
     conn.execute(
-        "UPDATE feed_info SET content_hash=? WHERE feed=? OR url=?",
-        [new_hash, feed, feed_url],
+        "UPDATE feed_info SET content_hash=? WHERE url=?",
+        [new_hash, feed_url],
     )
 
 
+def _parse_http_date(value):
+    """Parse an HTTP-date header value to epoch seconds, or None if unparseable."""
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:  # "-0000" means UTC, not unknown
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+_RE_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.I)
+
+# Longest delta-seconds header value we believe (about 300 years); anything
+# longer is junk, and would overflow datetime once added to now.
+_MAX_DELTA_DIGITS = 10
+
+
+def _delta_seconds(value):
+    """Parse a delta-seconds header value; None if it isn't one or is absurd."""
+    value = value.strip().strip('"')
+    if not value.isdigit() or len(value) > _MAX_DELTA_DIGITS:
+        return None
+    return int(value)
+
+
+def _freshness_hints(http_response, ceiling):
+    """Return (fresh_until, retry_until) epoch times from response headers.
+
+    fresh_until is set on a 200/304 when the body is fresh for a while: from
+    Cache-Control max-age (less any Age), else Expires (relative to the
+    server's Date, to cancel out clock skew).  retry_until is set on any other
+    status carrying Retry-After (delta-seconds or HTTP-date).  Either is None
+    when absent, already past, or unparseable, and neither is more than
+    ``ceiling`` seconds (the feed's backoff_max) away, since the scheduler
+    won't wait longer than that anyway.  Called by poll_source().
+    """
+    headers = http_response.headers
+    now = time.time()
+    fresh_until = retry_until = None
+    if http_response.status in (200, 304):
+        cache_control = headers.get("Cache-Control", "")
+        max_age = _RE_MAX_AGE.search(cache_control)
+        if "no-cache" in cache_control.lower() or "no-store" in cache_control.lower():
+            pass
+        elif max_age:
+            max_age = _delta_seconds(max_age.group(1))
+            age = _delta_seconds(headers.get("Age", "")) or 0
+            if max_age is not None:
+                fresh_until = now + max_age - age
+        elif "Expires" in headers:
+            expires = _parse_http_date(headers["Expires"])
+            date = _parse_http_date(headers.get("Date", "")) or now
+            if expires is not None:
+                fresh_until = now + (expires - date)
+    elif "Retry-After" in headers:
+        value = headers["Retry-After"]
+        delay = _delta_seconds(value)
+        retry_until = now + delay if delay is not None else _parse_http_date(value)
+    if fresh_until is not None:
+        fresh_until = None if fresh_until <= now else min(fresh_until, now + ceiling)
+    if retry_until is not None:
+        retry_until = None if retry_until <= now else min(retry_until, now + ceiling)
+    return fresh_until, retry_until
+
+
+def _epoch_to_iso(when):
+    """Return epoch seconds as a UTC ISO-8601 string, passing None through."""
+    if when is None:
+        return None
+    return datetime.fromtimestamp(when, timezone.utc).isoformat()
+
+
+def _iso_to_epoch(value):
+    """Inverse of _epoch_to_iso: ISO-8601 string (or None/empty) to epoch seconds."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _store_poll_state(conn, source):
+    """Persist a source's freshness hints and publish cadence.
+
+    Kept in feed_info so a restart honors the hints and resumes the learned
+    cadence.  Called by poll_source() just before it waits for the commit.
+    """
+    conn.execute(
+        "UPDATE feed_info SET fresh_until=?, retry_until=?, post_interval=?, "
+        "last_post=?, quiet_polls=? WHERE url=?",
+        [
+            _epoch_to_iso(source.fresh_until),
+            _epoch_to_iso(source.retry_until),
+            source.post_interval,
+            _epoch_to_iso(source.last_post),
+            source.quiet_polls,
+            source.feed_url,
+        ],
+    )
+
+
+def _store_schedule(conn, source):
+    """Persist when a source was last polled, when it's next due, and its backoff.
+
+    backoff is the current interval while the feed is backing off, else
+    NULL.  Called by PollScheduler after rescheduling a source.
+    """
+    conn.execute(
+        "UPDATE feed_info SET last_poll=?, next_due=?, backoff=? WHERE url=?",
+        [
+            _epoch_to_iso(source.last_poll),
+            _epoch_to_iso(source.next_due),
+            source.current_refresh if source.backing_off else None,
+            source.feed_url,
+        ],
+    )
+
+
+def _load_poll_state(conn, sources):
+    """Restore each source's stored hints, cadence and schedule. Called by PollScheduler.run().
+
+    Hints already in the past are dropped; next_due is kept even if it has
+    passed, so the scheduler can tell the source is overdue.
+    """
+    by_url = {source.feed_url: source for source in sources}
+    now = time.time()
+    for (
+        url,
+        fresh,
+        retry,
+        interval,
+        last_post,
+        quiet,
+        last_poll,
+        next_due,
+        backoff,
+    ) in conn.execute(
+        "SELECT url, fresh_until, retry_until, post_interval, last_post, "
+        "quiet_polls, last_poll, next_due, backoff FROM feed_info"
+    ):
+        source = by_url.get(url)
+        if source is None:
+            continue
+        fresh, retry = _iso_to_epoch(fresh), _iso_to_epoch(retry)
+        source.fresh_until = fresh if fresh and fresh > now else None
+        source.retry_until = retry if retry and retry > now else None
+        source.post_interval = interval
+        source.last_post = _iso_to_epoch(last_post)
+        source.quiet_polls = quiet or 0
+        source.last_poll = _iso_to_epoch(last_poll)
+        source.next_due = _iso_to_epoch(next_due)
+        if backoff:
+            source.current_refresh = min(backoff, source.backoff_max)
+            source.backing_off = True
+        else:
+            source.current_refresh = source.steady_interval()
+
+
 def _get_item_id(item, feed):
     """Return the best available unique id for a feed item, or None."""
     if item.get("id") is not None:
@@ -1024,38 +2892,43 @@ def _get_item_id(item, feed):
 _RE_URLISH_NAME = re.compile(r"^[A-Za-z0-9_]*(?:link|url)[A-Za-z0-9_]*$", re.I)
 
 
-def _extract_item_urls(item, FEED):
-    """Return the item's URL(s), derived from the feed's configured `fields`.
+def _url_fields(specs):
+    """Return the fields among a feed's ``fields`` specs that name the item's URL.
+
+    A field counts when the spec is <>-wrapped (the Discord-preview-suppressing
+    form, which in this bot always denotes a URL -- e.g. `<id>`, `<comments>`)
+    or its bare name looks URL-ish (`link`, `url`).  Called by FeedSettings.
+    """
+    fields = []
+    for spec in specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+        match = _RE_HIGHLIGHT.match(spec)
+        if match is not None and "<" in match.group(1) and ">" in match.group(3):
+            field = match.group(2)  # <field> wrapper -> always a URL
+        elif _RE_URLISH_NAME.match(spec):
+            field = spec  # bare link/url-ish field name
+        else:
+            continue
+        if field not in fields:
+            fields.append(field)
+    return tuple(fields)
+
+
+def _extract_item_urls(item, settings):
+    """Return the item's URL(s), from the feed's URL fields (see _url_fields()).
 
-    A configured field contributes its value when the spec is <>-wrapped (the
-    Discord-preview-suppressing form, which in this bot always denotes a URL --
-    e.g. `<id>`, `<comments>`) or its bare name looks URL-ish (`link`, `url`).
-    Values are resolved against feed_url and kept only if they are real URLs, so
-    an opaque id (reddit's `t3_...`) is skipped while its `link` is stored.  The
-    result is joined into feed_items.urls purely so a row can be located and
-    deleted by URL to force re-processing.  Never raises -- returns [] on trouble.
+    Every channel's fields are considered -- an item is stored once per feed,
+    so any spec that could name its URL counts.  Values are resolved against
+    feed_url and kept only if they are real URLs, so an opaque id (reddit's
+    `t3_...`) is skipped while its `link` is stored.  The result is joined into
+    feed_items.urls purely so a row can be located and deleted by URL to force
+    re-processing.  Never raises -- returns [] on trouble.
     """
     urls = []
     try:
-        feed_url = FEED.get("feed_url")
-        # Gather every configured field list: the feed default plus any
-        # per-channel `name.fields` override.  An item is stored once per feed,
-        # so we union all the field specs that could name its URL.
-        specs = []
-        for key in FEED:
-            if key == "fields" or key.endswith(".fields"):
-                specs.extend(FEED.get(key, "").split(","))
-        for spec in specs:
-            spec = spec.strip()
-            if not spec:
-                continue
-            match = _RE_HIGHLIGHT.match(spec)
-            if match is not None and "<" in match.group(1) and ">" in match.group(3):
-                field = match.group(2)  # <field> wrapper -> always a URL
-            elif _RE_URLISH_NAME.match(spec):
-                field = spec  # bare link/url-ish field name
-            else:
-                continue
+        for field in settings.url_fields:
             value = item.get(field)
             if not isinstance(value, str) or not value.strip():
                 continue
@@ -1063,7 +2936,7 @@ def _extract_item_urls(item, FEED):
             # Skip anything that isn't actually a URL (e.g. an opaque id).
             if "://" not in value and not value.startswith("/"):
                 continue
-            resolved = urljoin(feed_url, value)
+            resolved = urljoin(settings.feed_url, value)
             if resolved not in urls:
                 urls.append(resolved)
     except Exception:
@@ -1072,70 +2945,237 @@ def _extract_item_urls(item, FEED):
     return urls
 
 
-def _apply_channel_filter(channel, item, FEED, feed):
+def _apply_channel_filter(channel, item, feed, memo):
     """Return True if item passes the filter configured for this channel."""
-    filter_field = FEED.get(
-        channel["name"] + ".filter_field",
-        FEED.get("filter_field", "title"),
-    )
-    if channel["name"] + ".filter" in FEED or "filter" in FEED:
-        logger.debug(feed + ":item:running filter for" + channel["name"])
-        regexpat = FEED.get(
-            channel["name"] + ".filter",
-            FEED.get("filter", "^.*$"),
-        )
-        logger.info(
-            feed
-            + ":item:using filter:"
-            + regexpat
-            + " on "
-            + item.get("title", "?")
-            + " field "
-            + filter_field
-        )
-        match = re.search(regexpat, process_field(filter_field, item, FEED, channel))
-        if match is None:
-            logger.info(feed + ":item:failed filter for " + channel["name"])
-            return False
+    filt = channel["plan"].filter
+    if filt is None:
+        logger.debug("%s:item:no filter configured for %s", feed, channel["name"])
         return True
-    if channel["name"] + ".filter_exclude" in FEED or "filter_exclude" in FEED:
-        logger.debug(feed + ":item:running exclude filter for" + channel["name"])
-        regexpat = FEED.get(
-            channel["name"] + ".filter_exclude",
-            FEED.get("filter_exclude", "^.*$"),
+    kind = "filter_exclude" if filt.exclude else "filter"
+    logger.info(
+        "%s:item:using %s:%s on %s field %s",
+        feed,
+        kind,
+        filt.pattern,
+        item.get("title", "?"),
+        filt.field,
+    )
+    if filt.matches(item, channel, memo) == filt.exclude:
+        logger.info("%s:item:failed %s for %s", feed, kind, channel["name"])
+        return False
+    logger.info("%s:item:passed %s for %s", feed, kind, channel["name"])
+    return True
+
+
+# Ids per "IN (...)" lookup in _seen_item_ids(); well under SQLite's limit
+# on bound parameters (999 before SQLite 3.32).
+SEEN_LOOKUP_CHUNK = 500
+
+
+# New ids held in a SeenIndex's set before being merged into its sorted array.
+SEEN_INDEX_MERGE = 65536
+
+
+class SeenIndex:
+    """Membership index over feed_items.id, at about 8 bytes per id.
+
+    Holds each id's 64-bit ``hash()`` in a sorted array (binary search),
+    plus a set of ids added since the last merge.  It's exact apart from
+    hash collisions: a new id is wrongly taken as seen only if it shares a
+    64-bit hash with a stored one, about one chance in 10**13 per new item
+    at a million stored ids.  It only ever grows: rows deleted from the
+    database (say, to force a re-send) stay "seen" until the bot restarts.
+    """
+
+    def __init__(self, itemids=()):
+        self.hashes = array.array("q", sorted(hash(itemid) for itemid in itemids))
+        self.recent = set()
+
+    def __len__(self):
+        return len(self.hashes) + len(self.recent)
+
+    def __contains__(self, itemid):
+        value = hash(itemid)
+        if value in self.recent:
+            return True
+        pos = bisect.bisect_left(self.hashes, value)
+        return pos < len(self.hashes) and self.hashes[pos] == value
+
+    def add(self, itemid):
+        self.recent.add(hash(itemid))
+        if len(self.recent) >= SEEN_INDEX_MERGE:
+            self.hashes = array.array(
+                "q", sorted(itertools.chain(self.hashes, self.recent))
+            )
+            self.recent = set()
+
+
+def load_seen_index(config):
+    """Build the SeenIndex from feed_items if [MAIN] seen_index is on. Called by main()."""
+    global seen_index
+    if not config["MAIN"].getboolean("seen_index", False):
+        return
+    started = time.monotonic()
+    conn = get_sql_connection(config)
+    try:
+        seen_index = SeenIndex(
+            row[0] for row in conn.execute("SELECT id FROM feed_items")
         )
-        logger.info(
-            feed
-            + ":item:using filter_exclude:"
-            + regexpat
-            + " on "
-            + item.get("title", "?")
-            + " field "
-            + filter_field
+    finally:
+        conn.close()
+    logger.info(
+        "seen_index: loaded %d item ids in %.1f seconds",
+        len(seen_index),
+        time.monotonic() - started,
+    )
+
+
+def _seen_item_ids(conn, itemids):
+    """Return the set of itemids already in feed_items.
+
+    Ids the seen_index knows are answered from memory; the rest are looked
+    up with one ``IN (...)`` query per SEEN_LOOKUP_CHUNK ids, instead of a
+    SELECT per entry.  Called by poll_source().
+    """
+    seen = set()
+    if seen_index is not None:
+        seen.update(itemid for itemid in itemids if itemid in seen_index)
+        itemids = [itemid for itemid in itemids if itemid not in seen]
+    for start in range(0, len(itemids), SEEN_LOOKUP_CHUNK):
+        chunk = itemids[start : start + SEEN_LOOKUP_CHUNK]
+        seen.update(
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM feed_items WHERE id IN (%s)"
+                % ",".join("?" * len(chunk)),
+                chunk,
+            )
         )
-        match = re.search(regexpat, process_field(filter_field, item, FEED, channel))
-        if match is not None:
-            logger.info(feed + ":item:failed exclude filter for " + channel["name"])
-            return False
-        logger.info(feed + ":item:passed exclude filter for " + channel["name"])
-        return True
-    logger.debug(feed + ":item:no filter configured for" + channel["name"])
-    return True
+    return seen
 
 
-def _collect_item_sends(item, itemid, pubdate, feed, FEED, channels, conn, max_age):
-    """Mark item seen and return the messages to send for it.
+def _mark_items_seen(conn, rows):
+    """Insert (itemid, pubdate, urls) rows into feed_items so they're never re-sent.
 
-    Inserts the item into feed_items (so it's never re-sent), then -- if it's
-    within max_age -- builds the message for each channel that passes its filter.
-    Returns a list of (channel, message) tuples (empty for stale/filtered items).
-    Does not send anything; the caller batches and paces the actual sends.
-    Called by background_check_feed()."""
-    urls = _extract_item_urls(item, FEED)
-    conn.execute(
+    One executemany for the whole poll.  Called by _store_poll_items().
+    """
+    conn.executemany(
         "INSERT INTO feed_items (id,published,urls) VALUES (?,?,?)",
-        [itemid, pubdate.isoformat(), " ".join(urls) if urls else None],
+        [
+            (itemid, pubdate.isoformat(), " ".join(urls) if urls else None)
+            for itemid, pubdate, urls in rows
+        ],
     )
+
+
+def _index_seen_items(conn, rows):
+    """Add committed feed_items rows to the seen_index. Called by poll_source().
+
+    Only once they're committed: an id left in the index after its row was
+    rolled back would never be sent.
+    """
+    for itemid, _, _ in rows:
+        seen_index.add(itemid)
+
+
+def _posted_channel_urls(conn, channel_keys, urls):
+    """Return {(channel key, url): posted} for channel_urls rows among these.
+
+    One ``IN (...)`` query per SEEN_LOOKUP_CHUNK urls.  Called by
+    poll_source().
+    """
+    channel_keys = list(channel_keys)
+    urls = list(urls)
+    found = {}
+    step = max(1, SEEN_LOOKUP_CHUNK - len(channel_keys))
+    for start in range(0, len(urls), step):
+        chunk = urls[start : start + step]
+        for key, url, posted in conn.execute(
+            "SELECT channel_id, url, posted FROM channel_urls "
+            f"WHERE channel_id IN ({','.join('?' * len(channel_keys))}) "
+            f"AND url IN ({','.join('?' * len(chunk))})",
+            channel_keys + chunk,
+        ):
+            found[key, url] = posted
+    return found
+
+
+def _record_channel_urls(conn, rows):
+    """Store (channel key, url, posted) rows in channel_urls. Called by _store_poll_items()."""
+    conn.executemany("INSERT OR REPLACE INTO channel_urls VALUES (?,?,?)", rows)
+
+
+class PostedUrls:
+    """Which URLs each dedupe_days channel was already sent, for one poll.
+
+    ``found`` comes from one batched channel_urls lookup for every new item's
+    URLs (see _extract_item_urls()), made before anything is rendered.
+    sent() says whether a channel got one of an item's URLs within its
+    dedupe_days -- from any feed; claim() notes the URLs of an item that will
+    be sent, so a second copy in the same poll is caught too.  record()
+    collects them in ``rows`` for channel_urls once the item's message is
+    built.
+    """
+
+    def __init__(self, found=None):
+        self.found = found or {}
+        self.now = time.time()
+        self.rows = []
+
+    def sent(self, channel, urls):
+        days = channel["settings"].dedupe_days
+        if days <= 0:
+            return False
+        cutoff = self.now - days * 86400
+        for url in urls:
+            posted = self.found.get((channel["key"], url))
+            if posted is not None and posted >= cutoff:
+                return True
+        return False
+
+    def claim(self, channel, urls):
+        if channel["settings"].dedupe_days <= 0:
+            return
+        for url in urls:
+            self.found[channel["key"], url] = self.now
+
+    def record(self, channel, urls):
+        if channel["settings"].dedupe_days <= 0:
+            return
+        for url in urls:
+            self.rows.append((channel["key"], url, self.now))
+
+
+def _store_poll_items(conn, seen_rows, url_rows, messages):
+    """Write one poll's outbox messages, seen items and channel_urls rows, or none of them.
+
+    They go in under one savepoint, rolled back (leaving other polls'
+    pending writes alone) if any write fails, so an item is never stored as
+    seen without its messages.  Called by poll_source().
+    """
+    conn.execute("SAVEPOINT poll_items")
+    try:
+        _outbox_add(conn, messages)
+        _mark_items_seen(conn, seen_rows)
+        _record_channel_urls(conn, url_rows)
+    except sqlite3.Error:
+        conn.execute("ROLLBACK TO poll_items")
+        conn.execute("RELEASE poll_items")
+        for entry in messages:
+            entry.id = None
+        raise
+    conn.execute("RELEASE poll_items")
+
+
+def _item_channels(item, pubdate, settings, channels, memo, urls, posted_urls):
+    """Return the channels one feed section should send a new item to.
+
+    Empty if the item is older than max_age; otherwise the channels whose
+    filter it passes, less any already sent one of the item's ``urls``
+    (see PostedUrls, which is told about the rest).  ``memo`` is the item's
+    render memo, shared across sections.  Called by poll_source()."""
+    feed = settings.name
+    max_age = settings.max_age
     time_since_published = datetime.now(timezone.utc) - pubdate
     logger.trace(
         "%s:time_since_published.total_seconds:%s,max_age:%s",
@@ -1151,236 +3191,678 @@ def _collect_item_sends(item, itemid, pubdate, feed, FEED, channels, conn, max_a
         logger.verbose("%s:pubDate:%r", feed, pubdate)
         logger.verbose(item)
         return []
-    logger.info(feed + ":item:fresh and ready for parsing")
-    sends = []
+    logger.info("%s:item:fresh and ready for parsing", feed)
+    passed = []
     for channel in channels:
-        if _apply_channel_filter(channel, item, FEED, feed):
-            logger.debug(feed + ":item:building message for " + channel["name"])
-            message = build_message(FEED, item, channel)
-            sends.append((channel, message))
+        if posted_urls.sent(channel, urls):
+            logger.info(
+                "%s:item:%s already got this item's URL, skipping",
+                feed,
+                channel["name"],
+            )
+        elif _apply_channel_filter(channel, item, feed, memo):
+            passed.append(channel)
+            posted_urls.claim(channel, urls)
         else:
             logger.info(
-                feed
-                + ":item:skipping item due to not passing filter for "
-                + channel["name"]
+                "%s:item:skipping item due to not passing filter for %s",
+                feed,
+                channel["name"],
             )
-    return sends
-
-
-async def background_check_feed(feed):
-    """Poll one feed forever: fetch, parse, dedupe, filter, and send new items. Called by main() via loop.create_task()."""
-    # Try to wait until Discord client has connected, etc:
-    await asyncio.sleep(5)
-    await client.wait_until_ready()
-    # make sure debug output has this check run in the right order...
-    await asyncio.sleep(1)
-
-    user_agent = config["MAIN"].get("user_agent", USER_AGENT)
-
-    # just a bit easier to use...
-    FEED = config[feed]
-
-    # pull config for this feed out:
-    feed_url = FEED.get("feed_url")
-    logger.info("Starting feed: %s (%s)", feed, feed_url)
-    if not feed_url:
-        logger.warning("%s: no feed_url configured — feed will never fetch", feed)
-    rss_refresh_time = FEED.getint("rss_refresh_time", 3600)
-    start_skew = FEED.getint("start_skew", rss_refresh_time)
-    start_skew_min = FEED.getint("start_skew_min", 1)
-    max_age = FEED.getint("max_age", 86400)
-    # Cap for the exponential backoff applied on rate-limit/overload responses.
-    backoff_max = FEED.getint("backoff_max", 86400)
-
-    channels = _resolve_channels(feed, FEED, config, client)
-
-    if start_skew > 0:
-        sleep_time = random.uniform(start_skew_min, start_skew)
-        logger.debug("%s:start_skew:sleeping for %.1f seconds", feed, sleep_time)
-        await asyncio.sleep(sleep_time)
-
-    # One HTTP session per feed task, reused across polls instead of opening
-    # (and tearing down) a fresh one on every fetch.
-    httpclient = aiohttp.ClientSession()
-
-    # Interval between polls.  Starts at the configured refresh time, doubles
-    # (up to backoff_max) when the feed rate-limits us, and resets on success.
-    current_refresh = rss_refresh_time
-
-    # Basically run forever
-    while True:
-        # And try to catch all the exceptions and just keep going
-        # (but see list of except/finally stuff below)
-        conn = None
-        try:
-            logger.info(feed + ": processing feed")
-
-            conn = get_sql_connection(config)
-            logger.trace(feed + ":db_debug:conn=" + type(conn).__name__)
-
-            lastmodified, etag, stored_hash = _load_feed_cache(conn, feed, feed_url)
-            # Only advertise encodings we can always decode.  aiohttp would
-            # otherwise add "br", but some servers emit a brotli stream that
-            # even brotlicffi can't decode (raising ClientPayloadError and
-            # silently killing the feed); gzip/deflate are stdlib-backed.
-            http_headers = {
-                "User-Agent": user_agent,
-                "Accept-Encoding": "gzip, deflate",
-            }
-            if lastmodified:
-                http_headers["If-Modified-Since"] = lastmodified
-            if etag:
-                http_headers["If-None-Match"] = etag
-
-            logger.debug(feed + ":sending http request for " + feed_url)
-            # Send actual request.  await can yield control to another instance.
-            http_response = await httpclient.get(feed_url, headers=http_headers)
-
-            # Rate-limited / overloaded: exponentially back off how often we
-            # poll this feed (double the interval, capped at backoff_max).
-            # Handled here (not in _read_feed_response) so current_refresh stays
-            # in one place.
+    return passed
+
+
+def _build_sends(routes, posted_urls, seen_rows, outgoing):
+    """Build one poll's OutboxMessages into ``outgoing``, in order.
+
+    ``routes`` lists (seen row, sends) for each new item, oldest first;
+    ``sends`` lists (settings, channel, item, memo) for every section
+    channel that should get it.  Normally each becomes its own message.
+    Digest mode: when a channel gets more than its digest_threshold items
+    from one poll, they're sent instead as one build_digest_line() each,
+    packed with _split_message() into as few messages as fit -- after the
+    channel's other messages.
+
+    Items go into ``seen_rows`` (and their URLs into ``posted_urls``) as
+    they're built, so if one fails to build, the items after it stay unseen
+    and are tried again next poll.  The failing item itself is marked seen,
+    so it can't hold up the feed forever, and digest lines already built
+    are still packed and sent.  Called by poll_source().
+    """
+    counts = collections.Counter(
+        (settings.name, channel["name"])
+        for _, sends in routes
+        for settings, channel, _, _ in sends
+    )
+    digests = {}
+    try:
+        for row, sends in routes:
+            seen_rows.append(row)
+            for settings, channel, item, memo in sends:
+                feed = settings.name
+                threshold = channel["settings"].digest_threshold
+                if threshold > 0 and counts[feed, channel["name"]] > threshold:
+                    digest = digests.setdefault(
+                        (feed, channel["name"]), (settings, channel, [])
+                    )
+                    digest[2].append(build_digest_line(item, channel, memo))
+                else:
+                    logger.debug(
+                        "%s:item:building message for %s", feed, channel["name"]
+                    )
+                    outgoing.append(
+                        OutboxMessage(
+                            settings,
+                            channel,
+                            build_message(settings, item, channel, memo),
+                        )
+                    )
+                posted_urls.record(channel, row[2])
+    finally:
+        for settings, channel, lines in digests.values():
+            chunks = _split_message("\n".join(lines))
+            logger.info(
+                "%s:%s:digest of %d items in %d message(s)",
+                settings.name,
+                channel["name"],
+                len(lines),
+                len(chunks),
+            )
+            for chunk in chunks:
+                outgoing.append(OutboxMessage(settings, channel, chunk))
+
+
+# Outcome of one poll, returned by poll_source().  PollScheduler turns it into
+# the source's next interval: CHANGED/UNCHANGED reset to rss_refresh_time,
+# BACKOFF doubles the interval (up to backoff_max), FAILED retries at the
+# current one.
+POLL_CHANGED = "changed"
+POLL_UNCHANGED = "unchanged"
+POLL_BACKOFF = "backoff"
+POLL_FAILED = "failed"
+
+
+class FeedState:
+    """One feed section: its settings, and the channels to send new items to.
+
+    Built once per feed section at startup from its FeedSettings.
+    ``channels`` is resolved on the first poll, once the Discord client is
+    ready.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.feed = settings.name
+        self.feed_url = settings.feed_url
+        self.channels = None
+
+    def get_channels(self):
+        """Return the section's channel dicts, resolving them on first use."""
+        if self.channels is None:
+            logger.info("Starting feed: %s (%s)", self.feed, self.feed_url)
+            self.channels = _resolve_channels(self.settings, client)
+        return self.channels
+
+
+# Weight of the newest gap in FeedSource.post_interval's moving average.
+CADENCE_WEIGHT = 0.3
+
+
+class FeedSource:
+    """One distinct feed_url and the sections subscribed to it.
+
+    Several sections may point at the same URL with different fields, filters
+    or channels; it is still fetched and parsed only once per poll, and the
+    parsed entries are handed to every section.  Polling state lives here:
+    the source polls as often as its most eager section asks (smallest
+    rss_refresh_time, start_skew, start_skew_min and backoff_max), and
+    ``current_refresh`` is the interval until its next poll.  The server can
+    push that later -- never earlier -- with freshness headers (``fresh_until``,
+    ``retry_until``), up to backoff_max.
+
+    With ``adaptive_refresh`` on (in every section sharing the URL), the
+    healthy interval is learned instead of fixed: half the feed's average gap
+    between posts (an EWMA over new items' dates), stretched 1.5x for each
+    poll in a row that found nothing new, and kept within
+    [refresh_min, refresh_max].  Until a gap has been seen it starts from
+    rss_refresh_time.
+    """
+
+    def __init__(self, feed_url, sections):
+        self.feed_url = feed_url
+        self.sections = sections
+        self.name = ",".join(section.feed for section in sections)
+        settings = [section.settings for section in sections]
+        self.rss_refresh_time = min(S.rss_refresh_time for S in settings)
+        self.start_skew = min(S.start_skew for S in settings)
+        self.start_skew_min = min(S.start_skew_min for S in settings)
+        # Cap for the exponential backoff applied on rate-limit/overload responses.
+        self.backoff_max = min(S.backoff_max for S in settings)
+        self.current_refresh = self.rss_refresh_time
+        self.backing_off = False
+        self.host = get_host_limiter(feed_url)
+        self.entry_keys = _entry_keys(settings)
+        # Keys of the channels that skip URLs they were already sent
+        # (dedupe_days).
+        self.dedupe_channel_keys = frozenset(
+            channel.key
+            for S in settings
+            for channel in S.channels
+            if channel.dedupe_days > 0 and channel.key is not None
+        )
+        self.user_agent = MAIN.get("user_agent", USER_AGENT)
+        # Epoch times from the server's cache/retry headers: poll no sooner.
+        self.fresh_until = None
+        self.retry_until = None
+        self.adaptive = all(S.adaptive_refresh for S in settings)
+        self.refresh_min = min(S.refresh_min for S in settings)
+        self.refresh_max = min(S.refresh_max for S in settings)
+        # Observed cadence: EWMA of seconds between posts, newest post's epoch
+        # time, and polls in a row without a new item.
+        self.post_interval = None
+        self.last_post = None
+        self.quiet_polls = 0
+        # Epoch times of the last poll's start and of the next poll; stored
+        # so a restart resumes the schedule.
+        self.last_poll = None
+        self.next_due = None
+
+    def initial_delay(self):
+        """Seconds before the first poll: random in [start_skew_min, start_skew]."""
+        if self.start_skew > 0:
+            return random.uniform(self.start_skew_min, self.start_skew)
+        return 0
+
+    def observe_posts(self, pubdates):
+        """Fold one successful poll's new-item dates into the cadence stats.
+
+        An item without a usable date (None) still counts as activity, but
+        is left out of the average: standing in "now" for its date would
+        make every gap about zero and pin the feed at refresh_min.
+        """
+        if not pubdates:
+            self.quiet_polls += 1
+            return
+        self.quiet_polls = 0
+        previous = self.last_post
+        for when in sorted(date.timestamp() for date in pubdates if date is not None):
+            if previous is not None and when >= previous:
+                gap = when - previous
+                if self.post_interval is None:
+                    self.post_interval = gap
+                else:
+                    self.post_interval = (
+                        CADENCE_WEIGHT * gap + (1 - CADENCE_WEIGHT) * self.post_interval
+                    )
+            if previous is None or when > previous:
+                previous = when
+        self.last_post = previous
+
+    def steady_interval(self):
+        """Seconds between polls while the feed is healthy (not backing off)."""
+        if not self.adaptive:
+            return self.rss_refresh_time
+        if self.post_interval is None:
+            target = self.rss_refresh_time
+        else:
+            target = self.post_interval / 2
+        target *= 1.5 ** min(self.quiet_polls, 20)
+        return int(min(max(target, self.refresh_min), self.refresh_max))
+
+
+def build_feed_sources(feed_settings):
+    """Group feed sections (FeedSettings) by feed_url into FeedSources. Called by main()."""
+    by_url = {}
+    for settings in feed_settings:
+        section = FeedState(settings)
+        if not section.feed_url:
+            logger.warning(
+                "%s: no feed_url configured — feed will never fetch", section.feed
+            )
+            continue
+        by_url.setdefault(section.feed_url, []).append(section)
+    sources = [FeedSource(url, sections) for url, sections in by_url.items()]
+    for source in sources:
+        if len(source.sections) > 1:
+            logger.info(
+                "%s: share %s; fetched once per poll", source.name, source.feed_url
+            )
+    return sources
+
+
+async def poll_source(source):
+    """Poll one feed URL once: fetch, parse, dedupe, then filter per section.
+
+    Returns (outcome, messages): outcome is one of the POLL_* values, and
+    messages the OutboxMessages for the new items, oldest-first and already
+    in the outbox, ready for queue_messages.  sqlite3 errors, including
+    a failed commit of this poll's writes, are logged and re-raised (so no
+    messages are queued); everything else is logged here.  Called by
+    PollScheduler.
+    """
+    name = source.name
+    feed_url = source.feed_url
+    user_agent = source.user_agent
+
+    for section in source.sections:
+        for channel in section.get_channels():
+            if isinstance(channel["object"], RestChannel):
+                await channel["object"].refresh()
+
+    # Freshness hints from this poll's response; see _freshness_hints().
+    source.fresh_until = source.retry_until = None
+    source.last_poll = time.time()
+    outgoing = []
+    seen_rows = []
+
+    db = get_feed_db()
+
+    # Try to catch all the exceptions and just keep going
+    # (but see list of except/finally stuff below)
+    try:
+        logger.info(name + ": processing feed")
+
+        lastmodified, etag, stored_hash = await db.run(
+            _load_feed_cache, source.sections[0].feed, feed_url
+        )
+        # Only advertise encodings we can always decode.  aiohttp would
+        # otherwise add "br", but some servers emit a brotli stream that
+        # even brotlicffi can't decode (raising ClientPayloadError and
+        # silently killing the feed); gzip/deflate are stdlib-backed.
+        http_headers = {
+            "User-Agent": user_agent,
+            "Accept-Encoding": "gzip, deflate",
+        }
+        if lastmodified:
+            http_headers["If-Modified-Since"] = lastmodified
+        if etag:
+            http_headers["If-None-Match"] = etag
+
+        logger.debug(name + ":sending http request for " + feed_url)
+        # Send actual request over the shared session.  await can yield
+        # control to another feed.  Leaving the block releases the
+        # connection back to the pool (kept alive for the next fetch).
+        async with get_http_session().get(
+            feed_url, headers=http_headers
+        ) as http_response:
+            source.fresh_until, source.retry_until = _freshness_hints(
+                http_response, source.backoff_max
+            )
+            # Rate-limited / overloaded: the scheduler backs off how often
+            # we poll this feed.
             if http_response.status in BACKOFF_STATUSES:
-                current_refresh = min(current_refresh * 2, backoff_max)
                 logger.warning(
-                    "%s:HTTP %s (rate-limited/overloaded); backing off, "
-                    "next check in %d seconds",
-                    feed,
+                    "%s:HTTP %s (rate-limited/overloaded); backing off",
+                    name,
                     http_response.status,
-                    current_refresh,
                 )
-                http_response.close()
-                raise HTTPError()
+                http_data = None
+            else:
+                http_data, new_hash = await _read_feed_response(
+                    http_response, name, stored_hash
+                )
+        if http_data is None:
+            return POLL_BACKOFF, []
+
+        # send_typing is configurable per-room.  Only do it now that we
+        # know the feed actually changed (HTTP 200, not a 304/not-modified),
+        # so we don't ping "typing..." on every no-op poll.
+        for section in source.sections:
+            await maybe_send_typing(section.settings, section.channels)
+
+        feed_data = await _parse_feed(http_data, name, source.entry_keys)
+
+        # Collect the unseen entries with their parsed dates.  Iterate
+        # reversed(entries) -- usually oldest-first -- so the stable sort
+        # below keeps the feed's order for items that share a timestamp.
+        logger.trace(name + ":processing entries")
+        candidates = []
+        for item in reversed(feed_data.entries):
+            itemid = _get_item_id(item, name)
+            if itemid:
+                candidates.append((itemid, item))
+        logger.trace("%s:checking database history for %d items", name, len(candidates))
+        seen = await db.run(_seen_item_ids, [itemid for itemid, _ in candidates])
+        new_items = []
+        item_dates = []
+        for itemid, item in candidates:
+            if itemid in seen:
+                logger.trace(name + ":item:" + itemid + " seen before, skipping")
+                continue
+            # Also skips an id the feed repeats within this one fetch.
+            seen.add(itemid)
+            logger.trace(name + ":item:itemid:" + itemid)
+            dated = item_date(item, TIMEZONE)
+            item_dates.append(dated)
+            # No date: treat it as published now (but see observe_posts).
+            pubdate = dated or datetime.now(timezone.utc)
+            new_items.append((pubdate, itemid, item))
+
+        # Post in chronological order: oldest first, newest last.  Sorting on
+        # the parsed pubdate (rather than trusting feed order) makes this hold
+        # even on the first run of a feed, or for feeds that aren't ordered.
+        new_items.sort(key=lambda entry: entry[0])
+        source.observe_posts(item_dates)
+
+        # Work out which section channels get each new item, then build the
+        # messages in chronological order, marking each item seen as it's
+        # built (see _build_sends).  The seen rows go in with one
+        # executemany, in `finally`, together with the messages built so far
+        # (see _store_poll_items): if an item fails, the ones before it are
+        # stored with their messages and the ones after it are left for the
+        # next poll.
+        routes = []
+        item_urls = []
+        for _, _, item in new_items:
+            urls = []
+            for section in source.sections:
+                for url in _extract_item_urls(item, section.settings):
+                    if url not in urls:
+                        urls.append(url)
+            item_urls.append(urls)
+        posted_urls = PostedUrls()
+        dedupe = bool(source.dedupe_channel_keys and new_items)
+        if dedupe:
+            await db.channel_urls_lock.acquire()
+        try:
+            if dedupe:
+                posted_urls.found = await db.run(
+                    _posted_channel_urls,
+                    source.dedupe_channel_keys,
+                    {url for urls in item_urls for url in urls},
+                )
+            try:
+                for (pubdate, itemid, item), urls in zip(new_items, item_urls):
+                    logger.info(name + ":item " + itemid + " unseen, processing:")
+                    sends = []
+                    routes.append(((itemid, pubdate, urls), sends))
+                    # Rendered field values, shared by every section and channel.
+                    memo = {}
+                    for section in source.sections:
+                        for channel in _item_channels(
+                            item,
+                            pubdate,
+                            section.settings,
+                            section.channels,
+                            memo,
+                            urls,
+                            posted_urls,
+                        ):
+                            sends.append((section.settings, channel, item, memo))
+            finally:
+                # Even if routing failed partway, build what was routed.
+                _build_sends(routes, posted_urls, seen_rows, outgoing)
+        finally:
+            try:
+                await db.run(_store_poll_items, seen_rows, posted_urls.rows, outgoing)
+            except sqlite3.Error:
+                # Nothing of this poll's items was stored; they're new again
+                # next time.
+                seen_rows = []
+                outgoing = []
+                raise
+            finally:
+                if dedupe:
+                    db.channel_urls_lock.release()
+        # Only now is every new item stored.  Until then the next poll must
+        # fetch and parse the feed again, rather than get a 304 or an
+        # unchanged hash and skip the items left unseen.
+        await db.run(_store_feed_cache, http_response, new_hash, name, feed_url)
+        return POLL_CHANGED, outgoing
+
+    # This is completely expected behavior for a well-behaved feed:
+    except HTTPNotModified:
+        logger.debug(name + ":Headers indicate feed unchanged since last time fetched:")
+        logger.trace("%s:exc_info: %s", name, sys.exc_info())
+        source.observe_posts([])
+        return POLL_UNCHANGED, []
+    # Many feeds have random periodic problems that shouldn't cause
+    # permanent death.  The specific status was already logged above (the
+    # status / backoff line), so retry quietly -- the bare HTTPError we
+    # raise as our "non-200" signal carries no detail worth a WARNING.
+    # (Genuinely unexpected errors are caught by `except Exception` below,
+    # which logs a full traceback.)
+    except HTTPError:
+        logger.debug("%s:HTTP error, treating as transient; will retry later", name)
+        logger.trace("%s:exc_info: %s", name, sys.exc_info())
+    # sqlite3 errors are probably really bad and we should just totally
+    # give up on life
+    except sqlite3.Error:
+        logger.exception("%s:sqlite error", name)
+        logger.trace("%s:exc_info: %s", name, sys.exc_info())
+        raise
+    # Transient network problems -- server dropped the connection, connection
+    # refused/reset, request timed out, etc.  Like the HTTP errors above these
+    # are expected and self-heal on the next poll, so log one concise line
+    # (with the feed name) instead of a scary "unexpected error" traceback.
+    except (aiohttp.ClientError, asyncio.TimeoutError) as neterr:
+        logger.warning(
+            "%s:network error (%s); will retry later", name, type(neterr).__name__
+        )
+    # unknown error: definitely give up and die and move on
+    except Exception:
+        logger.exception("%s:Unexpected error - giving up", name)
+    finally:
+        # Save the polling state, then wait for the group commit covering
+        # whatever this poll wrote, however the poll ended -- so new items
+        # are durably marked seen before their messages go out.  If that
+        # fails, the error propagates instead of the messages.
+        await db.run(_store_poll_state, source)
+        await db.commit()
+        if seen_index is not None and seen_rows:
+            await db.run(_index_seen_items, seen_rows)
+    return POLL_FAILED, outgoing
+
+
+class PollScheduler:
+    """Poll every feed source from one priority queue of next-due times.
+
+    Replaces one sleeping coroutine per feed.  A heap holds each source's next
+    due time; run() hands due sources to a fixed pool of
+    ``max_concurrent_polls`` workers ([MAIN], default 20), which caps
+    concurrent fetches and smooths out bursts when many feeds come due
+    together.  Before a due source is handed over, its host's HostLimiter
+    must agree; otherwise the source waits as long as the host asks.  A
+    poll's messages are handed to the channels' ChannelQueues (see
+    queue_messages), so the source
+    is rescheduled straight away however long they take to send.
+
+    Each source's next due time and backoff are kept in feed_info, so a
+    restart picks the schedule up where it left off (see run()).
+    """
 
-            http_data, new_hash = await _read_feed_response(
-                http_response, feed, stored_hash
+    def __init__(self, sources, max_workers, catchup_window):
+        self.sources = sources
+        self.max_workers = max_workers
+        self.catchup_window = catchup_window
+        self._heap = []  # (due monotonic time, tiebreak, FeedSource)
+        self._tiebreak = itertools.count()
+        self._due = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = set()  # strong refs, so pending tasks aren't collected
+
+    def schedule(self, source, delay):
+        """Queue source's next poll delay seconds from now."""
+        source.next_due = time.time() + delay
+        self._push(source, delay)
+        logger.info("%s:next check in %d seconds", source.name, delay)
+
+    def _push(self, source, delay):
+        due = time.monotonic() + delay
+        heapq.heappush(self._heap, (due, next(self._tiebreak), source))
+        self._wakeup.set()
+
+    def _dispatch(self, source):
+        """Hand a due source to the workers, if its host allows a fetch now."""
+        wait = source.host.acquire(source)
+        if wait is None:
+            logger.debug(
+                "%s:host %s busy; waiting for a free slot",
+                source.name,
+                source.host.host,
             )
-
-            # Server responded with 200; clear any previous backoff.
-            if current_refresh != rss_refresh_time:
+        elif wait > 0:
+            logger.debug(
+                "%s:host %s asks to wait %.1f seconds",
+                source.name,
+                source.host.host,
+                wait,
+            )
+            self._push(source, wait)
+        else:
+            self._due.put_nowait(source)
+
+    def next_interval(self, source, outcome):
+        """Return the seconds until source's next poll, given its last outcome.
+
+        A Retry-After is obeyed exactly; Cache-Control/Expires freshness only
+        ever lengthens the interval.  Both are capped at backoff_max.
+        """
+        now = time.time()
+        if source.retry_until is not None:
+            delay = min(source.retry_until - now, source.backoff_max)
+            logger.info("%s:server asked for a retry in %d seconds", source.name, delay)
+            return max(delay, 0)
+        if outcome == POLL_BACKOFF:
+            source.current_refresh = min(source.current_refresh * 2, source.backoff_max)
+            source.backing_off = True
+        elif outcome in (POLL_CHANGED, POLL_UNCHANGED):
+            source.current_refresh = source.steady_interval()
+            if source.backing_off:
                 logger.warning(
                     "%s:recovered; refresh interval back to %d seconds",
-                    feed,
-                    rss_refresh_time,
+                    source.name,
+                    source.current_refresh,
                 )
-                current_refresh = rss_refresh_time
-
-            # send_typing is configurable per-room.  Only do it now that we
-            # know the feed actually changed (HTTP 200, not a 304/not-modified),
-            # so we don't ping "typing..." on every no-op poll.
-            await maybe_send_typing(FEED, feed, channels)
-
-            feed_data = _parse_feed(http_data, feed)
-            _store_feed_cache(conn, http_response, new_hash, feed, feed_url)
-            http_response.close()
-
-            # Collect the unseen entries with their parsed dates.  Iterate
-            # reversed(entries) -- usually oldest-first -- so the stable sort
-            # below keeps the feed's order for items that share a timestamp.
-            logger.trace(feed + ":processing entries")
-            new_items = []
-            for item in reversed(feed_data.entries):
-                itemid = _get_item_id(item, feed)
-                if not itemid:
-                    continue
-
-                pubdate = extract_best_item_date(item, TIMEZONE)
-                logger.trace(feed + ":item:itemid:" + itemid)
-                logger.trace(feed + ":item:checking database history for this item")
-                if conn.execute(
-                    "SELECT 1 FROM feed_items WHERE id=?", [itemid]
-                ).fetchone():
-                    logger.trace(feed + ":item:" + itemid + " seen before, skipping")
-                    continue
-
-                new_items.append((pubdate, itemid, item))
-
-            # Post in chronological order: oldest first, newest last.  Sorting on
-            # the parsed pubdate (rather than trusting feed order) makes this hold
-            # even on the first run of a feed, or for feeds that aren't ordered.
-            new_items.sort(key=lambda entry: entry[0])
-
-            # Phase 1: mark every new item seen and build its per-channel
-            # messages, keyed by channel name and kept in chronological order.
-            sends_by_channel = {}
-            for pubdate, itemid, item in new_items:
-                logger.info(feed + ":item " + itemid + " unseen, processing:")
-                for channel, message in _collect_item_sends(
-                    item, itemid, pubdate, feed, FEED, channels, conn, max_age
-                ):
-                    sends_by_channel.setdefault(channel["name"], []).append(
-                        (channel, message)
-                    )
+                source.backing_off = False
+        interval = source.current_refresh
+        if source.fresh_until is not None and source.fresh_until - now > interval:
+            interval = min(source.fresh_until - now, source.backoff_max)
+            logger.debug("%s:server says fresh for %d seconds", source.name, interval)
+        return interval
+
+    def first_delays(self):
+        """Yield (source, seconds until its first poll) for every source.
+
+        A source polled by a previous run keeps its stored next due time (but
+        no later than one interval from now, in case rss_refresh_time was
+        lowered).  Sources that came due while the bot was down are spread
+        evenly over ``catchup_window`` seconds, most overdue first, instead
+        of all being fetched at once.  Sources never polled before wait a
+        random start_skew.
+        """
+        now = time.time()
+        overdue = []
+        for source in self.sources:
+            if source.next_due is None:
+                delay = source.initial_delay()
+                logger.debug(
+                    "%s:start_skew:first check in %.1f seconds", source.name, delay
+                )
+                yield source, delay
+            elif source.next_due > now:
+                delay = min(source.next_due - now, source.current_refresh)
+                logger.debug(
+                    "%s:resuming schedule:first check in %.1f seconds",
+                    source.name,
+                    delay,
+                )
+                yield source, delay
+            else:
+                overdue.append(source)
+        if not overdue:
+            return
+        overdue.sort(key=lambda source: source.next_due)
+        logger.info(
+            "%d feed(s) came due while stopped; catching up over %d seconds",
+            len(overdue),
+            self.catchup_window,
+        )
+        step = self.catchup_window / len(overdue)
+        for i, source in enumerate(overdue):
+            delay = max(i * step, source.start_skew_min)
+            logger.debug(
+                "%s:overdue by %d seconds:first check in %.1f seconds",
+                source.name,
+                now - source.next_due,
+                delay,
+            )
+            yield source, delay
 
-            # Persist the dedupe inserts and release the DB connection before the
-            # (potentially slow, paced) sending begins.  Clearing conn keeps the
-            # finally block from double-closing it.
-            conn.commit()
-            conn.close()
-            conn = None
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
 
-            # Phase 2: send each channel's batch oldest-first, spaced by
-            # send_interval so the sent order matches the visible order.
-            await _send_channel_batches(sends_by_channel, feed, FEED)
+    async def run(self):
+        """Wait for Discord (or check the API token), then dispatch due polls forever. Called by main()."""
+        if REST_DELIVERY:
+            await get_discord_rest().start()
+        else:
+            # Try to wait until Discord client has connected, etc:
+            await asyncio.sleep(5)
+            await client.wait_until_ready()
+
+        # Hints, cadence and schedule stored by a previous run still hold.
+        await get_feed_db().run(_load_poll_state, self.sources)
+        await replay_outbox(self.sources)
+        for source, delay in self.first_delays():
+            for hold in (source.fresh_until, source.retry_until):
+                if hold is not None:
+                    delay = max(delay, hold - time.time())
+            self.schedule(source, delay)
+        for _ in range(self.max_workers):
+            self._spawn(self._worker())
+
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, source = heapq.heappop(self._heap)
+                if now - due > 60:
+                    logger.debug(
+                        "%s:poll dispatched %d seconds late", source.name, now - due
+                    )
+                self._dispatch(source)
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
 
-        # This is completely expected behavior for a well-behaved feed:
-        except HTTPNotModified:
-            current_refresh = rss_refresh_time
-            logger.debug(
-                feed + ":Headers indicate feed unchanged since last time fetched:"
-            )
-            logger.trace("%s:exc_info: %s", feed, sys.exc_info())
-        # Many feeds have random periodic problems that shouldn't cause
-        # permanent death.  The specific status was already logged above (the
-        # status / backoff line), so retry quietly -- the bare HTTPError we
-        # raise as our "non-200" signal carries no detail worth a WARNING.
-        # (Genuinely unexpected errors are caught by `except Exception` below,
-        # which logs a full traceback.)
-        except HTTPError:
-            logger.debug("%s:HTTP error, treating as transient; will retry later", feed)
-            logger.trace("%s:exc_info: %s", feed, sys.exc_info())
-        # sqlite3 errors are probably really bad and we should just totally
-        # give up on life
-        except sqlite3.Error:
-            logger.exception("%s:sqlite error", feed)
-            logger.trace("%s:exc_info: %s", feed, sys.exc_info())
-            raise
-        # Ideally we'd remove the specific channel or something...
-        # But I guess just throw an error into the log and try again later...
-        except discord.errors.Forbidden:
-            logger.error(
-                "%s:discord.errors.Forbidden — bot may lack permission in a channel",
-                feed,
-            )
-            logger.trace("%s:exc_info: %s", feed, sys.exc_info())
-            # raise # or not? hmm...
-        # Transient network problems -- server dropped the connection, connection
-        # refused/reset, request timed out, etc.  Like the HTTP errors above these
-        # are expected and self-heal on the next poll, so log one concise line
-        # (with the feed name) instead of a scary "unexpected error" traceback.
-        except (aiohttp.ClientError, asyncio.TimeoutError) as neterr:
-            logger.warning(
-                "%s:network error (%s); will retry later", feed, type(neterr).__name__
-            )
-        # unknown error: definitely give up and die and move on
-        except Exception:
-            logger.exception("%s:Unexpected error - giving up", feed)
-            # Don't raise?
-            # raise
-        # No matter what goes wrong, wait same time and try again
-        finally:
-            # One commit per poll (instead of after every write) -- far fewer
-            # fsyncs -- then close the connection (else it leaks until GC,
-            # "ResourceWarning: unclosed database").  Committing here flushes
-            # whatever this poll wrote, however the poll ended.
-            if conn is not None:
-                try:
-                    conn.commit()
-                except sqlite3.Error:
-                    pass
-                conn.close()
-            logger.info(feed + ":sleeping for " + str(current_refresh) + " seconds")
-            await asyncio.sleep(current_refresh)
+    async def _worker(self):
+        while True:
+            source = await self._due.get()
+            outcome, messages = POLL_FAILED, []
+            try:
+                outcome, messages = await poll_source(source)
+            except sqlite3.Error as err:
+                # Often transient ("database is locked", a failed commit), so
+                # retry at the next check rather than dropping the feed.
+                logger.error(
+                    "%s:database error (%s); will retry at the next check",
+                    source.name,
+                    err,
+                )
+            except Exception:
+                # Anything else is a bug or a feed we didn't expect; it mustn't
+                # take this worker, the feed's schedule or its host slot with it.
+                logger.exception(
+                    "%s:unexpected error polling; will retry at the next check",
+                    source.name,
+                )
+            finally:
+                for parked in source.host.release(outcome, source.retry_until):
+                    self._push(parked, 0)
+            queue_messages(messages)
+            self.schedule(source, self.next_interval(source, outcome))
+            db = get_feed_db()
+            try:
+                await db.run(_store_schedule, source)
+            except sqlite3.Error:
+                logger.exception("%s:could not save poll schedule", source.name)
+            else:
+                db.commit_soon()
 
 
 @client.event
@@ -1399,6 +3881,8 @@ async def on_ready():
         client.user.id,
         len(client.guilds),
     )
+    # Role changes while we were away weren't seen; re-index on next use.
+    _guild_role_ids.clear()
 
     # set avatar if specified
     avatar_file_name = MAIN.get("avatarfile")
@@ -1410,6 +3894,30 @@ async def on_ready():
     await _set_presence()
 
 
+@client.event
+async def on_guild_role_create(role):
+    """Drop the guild's role index. Called by discord.py when a role is created."""
+    _guild_role_ids.pop(role.guild.id, None)
+
+
+@client.event
+async def on_guild_role_update(before, after):
+    """Drop the guild's role index. Called by discord.py when a role is renamed or edited."""
+    _guild_role_ids.pop(after.guild.id, None)
+
+
+@client.event
+async def on_guild_role_delete(role):
+    """Drop the guild's role index. Called by discord.py when a role is deleted."""
+    _guild_role_ids.pop(role.guild.id, None)
+
+
+@client.event
+async def on_guild_remove(guild):
+    """Forget the guild's role index. Called by discord.py when the bot leaves a guild."""
+    _guild_role_ids.pop(guild.id, None)
+
+
 @client.event
 async def on_disconnect():
     """Log disconnection. Called by discord.py when the WebSocket closes."""
@@ -1424,7 +3932,7 @@ async def on_resumed():
 
 
 def main():
-    """Create the asyncio event loop, launch one task per feed, and run the Discord client. Called from __main__."""
+    """Create the asyncio event loop, start the poll scheduler, and run the Discord client. Called from __main__."""
     # Create our own loop instead of asyncio.get_event_loop(), which is
     # deprecated (and slated for removal) when called with no running loop.
     loop = asyncio.new_event_loop()
@@ -1439,16 +3947,53 @@ def main():
     logger.notice(
         "Starting up feed2discord v%s with %d feed(s)", __version__, len(feeds)
     )
+    feed_settings = load_feed_settings(config, feeds)
     sql_maintenance(config)
+    load_seen_index(config)
+    executor = get_parse_executor()
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        # Start the parse workers now, while this is still a single-threaded
+        # process, rather than forking them later from under running threads.
+        concurrent.futures.wait(
+            [executor.submit(int) for _ in range(MAIN.getint("parse_workers", 2))]
+        )
+
+    scheduler = PollScheduler(
+        build_feed_sources(feed_settings),
+        MAIN.getint("max_concurrent_polls", 20),
+        MAIN.getint("catchup_window", 300),
+    )
+    retention = loop.create_task(
+        prune_old_rows(
+            max(
+                (C.dedupe_days for S in feed_settings for C in S.channels),
+                default=0,
+            )
+        )
+    )
 
     try:
-        for feed in feeds:
-            loop.create_task(background_check_feed(feed))
-        loop.run_until_complete(client.login(MAIN.get("login_token")))
-        loop.run_until_complete(client.connect())
+        if REST_DELIVERY:
+            # No gateway session: the scheduler is all there is to run.
+            loop.run_until_complete(scheduler.run())
+        else:
+            loop.create_task(scheduler.run())
+            loop.run_until_complete(client.login(MAIN.get("login_token")))
+            loop.run_until_complete(client.connect())
     except Exception:
         loop.run_until_complete(client.close())
     finally:
+        retention.cancel()
+        if publish_stats:
+            logger.notice("Publishing: %s", _publish_totals())
+        if _http_session is not None:
+            loop.run_until_complete(_http_session.close())
+        if _discord_rest is not None:
+            loop.run_until_complete(_discord_rest.close())
+        if _feed_db is not None:
+            loop.run_until_complete(_feed_db.close())
+        if _parse_executor is not None:
+            _parse_executor.shutdown(cancel_futures=True)
         loop.close()
 
 
@@ -21,15 +21,23 @@ the discovery helpers (``show_sample_entry.py``, ``show_all_entries.py``,
 ``newfeed.py``) always agree on which fields exist and how they render.
 """
 
+import collections
 import gzip
+import hashlib
 import html
 import re
+import string
+import textwrap
+import time
 import urllib.request
 import zlib
 from html.parser import HTMLParser
 
 import feedparser_rs as feedparser
 from html2text import HTML2Text
+from html2text.config import RE_SPACE
+from html2text.elements import ListElement
+from html2text.utils import escape_md_section, hn, skipwrap
 
 
 def http_get(url, user_agent, timeout=30):
@@ -55,15 +63,404 @@ def http_get(url, user_agent, timeout=30):
         return (resp.status, resp.geturl(), body, resp.headers.get("Content-Type", ""))
 
 
-# Shared HTML2Text, configured the way feed2discord renders body fields.
-# handle() resets its output buffer each call, so reusing one instance is safe.
-_h2t = HTML2Text()
-_h2t.ignore_links = True
-_h2t.ignore_images = True
-_h2t.ignore_emphasis = False
-_h2t.body_width = 1000
-_h2t.unicode_snob = True
-_h2t.ul_item_mark = "-"
+# Line width for rendered markdown: wide enough that html2text never wraps
+# prose in practice (Discord does its own wrapping).
+_BODY_WIDTH = 1000
+
+
+def _new_html2text():
+    """Return an HTML2Text configured the way feed2discord renders body fields."""
+    h2t = HTML2Text()
+    h2t.ignore_links = True
+    h2t.ignore_images = True
+    h2t.ignore_emphasis = False
+    h2t.body_width = _BODY_WIDTH
+    h2t.unicode_snob = True
+    h2t.ul_item_mark = "-"
+    return h2t
+
+
+class Html2TextEngine:
+    """The reference HTML->markdown engine: html2text itself.
+
+    Each document gets a fresh parser.  A shared one carried state over from
+    malformed HTML -- an unclosed list, ``<script>`` or ``<pre>`` in one item
+    changed how every later item rendered.
+    """
+
+    name = "html2text"
+
+    def render(self, text):
+        return _new_html2text().handle(text)
+
+
+class _Unsupported(Exception):
+    """Raised by _FastRenderer on HTML it doesn't handle identically."""
+
+
+# A start or end tag whose attributes contain no "<" or ">" (quoted or not);
+# anything else that starts with "<" (comments, doctypes, odd tag names, a
+# bare "<" in text) is left in the text, where it triggers the fallback.
+_FAST_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?\s*(/?)>")
+# Character/entity references html.parser would decode (or mangle).
+_FAST_ENTITY_RE = re.compile(r"&[a-zA-Z#]")
+_FAST_WS_RE = re.compile(r"\s+")
+# Text escape_md_section() would change (a superset of what it escapes).
+_FAST_MD_ESCAPE_RE = re.compile(r"\\|^\s*(?:\d+\.|[+-])", re.MULTILINE)
+_FAST_STRESS_SPACE_RE = re.compile(r"[^][(){}\s.!?]")
+_FAST_PUNCTUATION = frozenset(string.whitespace + string.punctuation)
+# Tags html2text does nothing with under our configuration.
+_FAST_NOOP_TAGS = frozenset(
+    [
+        "a",
+        "address",
+        "article",
+        "aside",
+        "big",
+        "body",
+        "center",
+        "cite",
+        "figcaption",
+        "figure",
+        "font",
+        "footer",
+        "header",
+        "html",
+        "img",
+        "ins",
+        "main",
+        "mark",
+        "nav",
+        "picture",
+        "section",
+        "small",
+        "source",
+        "span",
+        "sub",
+        "sup",
+        "time",
+        "wbr",
+    ]
+)
+# Tags whose self-closing form (<br/>) html.parser and _FAST_TAG_RE agree on
+# regardless of attributes, because their end tag does nothing.
+_FAST_VOID_TAGS = _FAST_NOOP_TAGS | {"br", "hr"}
+_FAST_TAGS = _FAST_NOOP_TAGS | frozenset(
+    [
+        "p",
+        "div",
+        "br",
+        "hr",
+        "blockquote",
+        "em",
+        "i",
+        "u",
+        "strong",
+        "b",
+        "del",
+        "strike",
+        "s",
+        "kbd",
+        "code",
+        "tt",
+        "ol",
+        "ul",
+        "li",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "h7",
+        "h8",
+        "h9",
+    ]
+)
+
+
+class _FastRenderer:
+    """One document's worth of html2text's state machine, minus html.parser.
+
+    A line-for-line port of the parts of ``HTML2Text.handle_tag``,
+    ``handle_data`` and ``o`` that matter with the bot's settings (no links,
+    images or tables; emphasis kept), fed by a single regex over the
+    document instead of html.parser's general tokenizer.  Anything outside
+    that subset raises _Unsupported.
+    """
+
+    def __init__(self):
+        self.outtextlist = []
+        self.p_p = 0
+        self.start = True
+        self.space = False
+        self.lastWasNL = False
+        self.stressed = False
+        self.preceding_stressed = False
+        self.preceding_data = ""
+        self.current_tag = ""
+        self.list = []
+        self.lastWasList = False
+        self.list_code_indent = ""
+        self.code = False
+        self.blockquote = 0
+
+    def run(self, text):
+        pos = 0
+        for m in _FAST_TAG_RE.finditer(text):
+            if m.start() > pos:
+                self.text(text[pos : m.start()])
+            pos = m.end()
+            end, tag, attrs, selfclose = m.groups()
+            tag = tag.lower()
+            if tag not in _FAST_TAGS:
+                raise _Unsupported
+            if end:
+                if selfclose:
+                    raise _Unsupported
+                self.tag(tag, False)
+                continue
+            if selfclose and attrs and tag not in _FAST_VOID_TAGS:
+                raise _Unsupported  # <p class=a/> isn't self-closing
+            if tag == "ol" and attrs and "start" in attrs.lower():
+                raise _Unsupported
+            self.tag(tag, True)
+            if selfclose:
+                self.tag(tag, False)
+        if pos < len(text):
+            self.text(text[pos:])
+        # HTML2Text.finish()
+        self.pbr()
+        self.o("", force="end")
+        return self.optwrap("".join(self.outtextlist))
+
+    def text(self, data):
+        if "<" in data or _FAST_ENTITY_RE.search(data):
+            raise _Unsupported
+        if "&" not in data:
+            self.data(data)
+            return
+        # html.parser hands a bare "&" over as its own chunk.
+        first, *rest = data.split("&")
+        self.data(first)
+        for chunk in rest:
+            self.data("&")
+            self.data(chunk)
+
+    def out(self, s):
+        self.outtextlist.append(s)
+        if s:
+            self.lastWasNL = s[-1] == "\n"
+
+    def p(self):
+        self.p_p = 2
+
+    def pbr(self):
+        if self.p_p == 0:
+            self.p_p = 1
+
+    def o(self, data, puredata=False, force=False):
+        if puredata:
+            data = _FAST_WS_RE.sub(" ", data)
+            if data and data[0] == " ":
+                self.space = True
+                data = data[1:]
+        if not data and not force:
+            return
+        bq = ">" * self.blockquote
+        if not (force and data and data[0] == ">") and self.blockquote:
+            bq += " "
+        if self.start:
+            self.space = False
+            self.p_p = 0
+            self.start = False
+        if force == "end":
+            self.p_p = 0
+            self.out("\n")
+            self.space = False
+        if self.p_p:
+            self.out(("\n" + bq) * self.p_p)
+            self.space = False
+        if self.space:
+            if not self.lastWasNL:
+                self.out(" ")
+            self.space = False
+        self.p_p = 0
+        self.out(data)
+
+    def data(self, data):
+        if not data:
+            return
+        if self.stressed:
+            data = data.strip()
+            self.stressed = False
+            self.preceding_stressed = True
+        elif self.preceding_stressed:
+            if (
+                _FAST_STRESS_SPACE_RE.match(data[0])
+                and not hn(self.current_tag)
+                and self.current_tag not in ("a", "code", "pre")
+            ):
+                data = " " + data
+            self.preceding_stressed = False
+        if not self.code and _FAST_MD_ESCAPE_RE.search(data):
+            data = escape_md_section(data, snob=False)
+        self.preceding_data = data
+        self.o(data, puredata=True)
+
+    def tag(self, tag, start):
+        self.current_tag = tag
+        if tag in _FAST_NOOP_TAGS:
+            self.lastWasList = False
+            return
+        n = hn(tag)
+        if n:
+            self.p()
+            if not start:
+                return
+            self.o("#" * n + " ")
+        elif tag in ("p", "div"):
+            self.p()
+        elif tag == "br":
+            if start:
+                self.o("  \n> " if self.blockquote > 0 else "  \n")
+        elif tag == "hr":
+            if start:
+                self.p()
+                self.o("* * *")
+                self.p()
+        elif tag == "blockquote":
+            if start:
+                self.p()
+                self.o("> ", force=True)
+                self.start = True
+                self.blockquote += 1
+            else:
+                self.blockquote -= 1
+                self.p()
+        elif tag in ("em", "i", "u"):
+            self.emphasis("_", start, self.preceding_data[-1:] not in _FAST_PUNCTUATION)
+        elif tag in ("strong", "b"):
+            self.emphasis("**", start, self.preceding_data[-1:] == "*")
+        elif tag in ("del", "strike", "s"):
+            self.emphasis("~~", start, self.preceding_data[-1:] == "~")
+        elif tag in ("kbd", "code", "tt"):
+            self.o("`")
+            self.code = not self.code
+
+        if tag in ("ol", "ul"):
+            if not self.list and not self.lastWasList:
+                self.p()
+            if start:
+                self.list.append(ListElement(tag, 0))
+            elif self.list:
+                self.list.pop()
+                if not self.list:
+                    self.o("\n")
+            self.lastWasList = True
+        else:
+            self.lastWasList = False
+
+        if tag == "li":
+            self.list_code_indent = ""
+            self.pbr()
+            if start:
+                li = self.list[-1] if self.list else ListElement("ul", 0)
+                parent_list = None
+                for lst in self.list:
+                    self.list_code_indent += "   " if parent_list == "ol" else "  "
+                    parent_list = lst.name
+                self.o(self.list_code_indent)
+                if li.name == "ul":
+                    self.list_code_indent += "  "
+                    self.o("- ")
+                else:
+                    li.num += 1
+                    self.list_code_indent += "   "
+                    self.o(str(li.num) + ". ")
+                self.start = True
+
+    def optwrap(self, text):
+        """HTML2Text.optwrap(), skipping textwrap for lines that fit.
+
+        o() has turned all other whitespace into plain spaces, so textwrap
+        would return such a line as is, less its trailing spaces.
+        """
+        result = []
+        newlines = 0
+        for para in text.split("\n"):
+            if not para:
+                if newlines < 2:
+                    result.append("\n")
+                    newlines += 1
+            elif not skipwrap(para, True, False, False):
+                indent = ""
+                if para.startswith("  -"):
+                    indent = "    "
+                elif para.startswith("> "):
+                    indent = "> "
+                if len(para) <= _BODY_WIDTH:
+                    result.append(para.rstrip(" "))
+                else:
+                    wrapped = textwrap.wrap(
+                        para,
+                        _BODY_WIDTH,
+                        break_long_words=False,
+                        subsequent_indent=indent,
+                    )
+                    result.append("\n".join(wrapped))
+                if para.endswith("  "):
+                    result.append("  \n")
+                    newlines = 1
+                elif indent:
+                    result.append("\n")
+                    newlines = 1
+                else:
+                    result.append("\n\n")
+                    newlines = 2
+            elif not RE_SPACE.match(para):
+                result.append(para + "\n")
+                newlines = 1
+        return "".join(result)
+
+    def emphasis(self, mark, start, spaced):
+        """Open or close an emphasis mark, spaced off the preceding text."""
+        if start and self.preceding_data and spaced:
+            mark = " " + mark
+            self.preceding_data += " "
+        self.o(mark)
+        if start:
+            self.stressed = True
+
+
+class FastEngine:
+    """A faster engine giving exactly html2text's output.
+
+    Plain feed HTML -- paragraphs, line breaks, lists, emphasis, headings,
+    blockquotes, and links/images (which the bot drops) -- goes through
+    _FastRenderer; any document using something else (tables, ``<pre>``,
+    entities, comments, ...) is rendered by html2text instead.
+    """
+
+    name = "fast"
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def render(self, text):
+        try:
+            return _FastRenderer().run(text)
+        except _Unsupported:
+            return self.fallback.render(text)
+
+
+# render_engine option values -> engine.  Every engine renders a document to
+# the same markdown html2text does; they differ only in speed.  The fast
+# engine is checked against the html2text version pinned in requirements.txt
+# by tools/check_render_engines.py.
+RENDER_ENGINES = {"html2text": Html2TextEngine()}
+RENDER_ENGINES["fast"] = FastEngine(RENDER_ENGINES["html2text"])
+DEFAULT_RENDER_ENGINE = "fast"
 
 
 def _is_mapping(obj):
@@ -120,18 +517,18 @@ def resolve_field(item, name):
     return None
 
 
-def render_text_field(value):
+def render_text_field(value, engine=DEFAULT_RENDER_ENGINE):
     """Render a field value the way feed2discord's bare-field path does.
 
-    Prose (anything containing whitespace) is converted HTML->markdown; a
-    whitespace-free value (a URL, id, or single token) is returned raw, because
-    html2text has nothing to convert there and actively corrupts URLs -- it
-    rewrites ``&e=2`` into ``&e;=2``.
+    Prose (anything containing whitespace) is converted HTML->markdown by the
+    named engine (see RENDER_ENGINES); a whitespace-free value (a URL, id, or
+    single token) is returned raw, because html2text has nothing to convert
+    there and actively corrupts URLs -- it rewrites ``&e=2`` into ``&e;=2``.
     """
     unescaped = html.unescape(value)
     if not re.search(r"\s", value):
         return unescaped
-    rendered = _h2t.handle(unescaped)
+    rendered = RENDER_ENGINES[engine].render(unescaped)
     return re.sub("<[^<]+?>", "", rendered).strip()
 
 
@@ -189,7 +586,9 @@ class _ElementStripper(HTMLParser):
     would re-escape attributes and corrupt things like ``&e=2`` in URLs).  A
     matched block element is removed through its *matching* close tag (depth
     counted so a nested same-name tag doesn't end it early); a matched void
-    element (``hr``, ``img``, ...) is removed as its single tag.
+    element (``hr``, ``img``, ...) is removed as its single tag.  Line start
+    offsets are tabulated once up front, so mapping the parser's (line, col)
+    position back to an index is O(1) per tag.
     """
 
     def __init__(self, raw, selectors):
@@ -200,14 +599,17 @@ class _ElementStripper(HTMLParser):
         self._skip_tag = None  # tag name of the block currently being skipped
         self._depth = 0  # open count of that tag, for nesting
         self._skip_start = None  # offset where the skipped block began
+        # Index in raw where each line starts (HTMLParser counts lines by "\n").
+        self._line_starts = [0]
+        idx = raw.find("\n")
+        while idx != -1:
+            self._line_starts.append(idx + 1)
+            idx = raw.find("\n", idx + 1)
 
     def _offset(self):
         """Absolute index into raw of the tag the parser is currently at."""
         line, col = self.getpos()
-        idx = 0
-        for _ in range(line - 1):
-            idx = self.raw.index("\n", idx) + 1
-        return idx + col
+        return self._line_starts[line - 1] + col
 
     def _matches(self, tag, attrs):
         attr = dict(attrs)
@@ -281,9 +683,17 @@ def strip_html_elements(raw, spec):
     parser = _ElementStripper(raw, selectors)
     parser.feed(raw)
     parser.close()
-    for start, end in sorted(parser.cuts, reverse=True):
-        raw = raw[:start] + raw[end:]
-    return raw
+    if not parser.cuts:
+        return raw
+    # Join the kept spans in one pass rather than re-slicing raw per cut.
+    kept = []
+    pos = 0
+    for start, end in sorted(parser.cuts):
+        if start > pos:
+            kept.append(raw[pos:start])
+        pos = max(pos, end)
+    kept.append(raw[pos:])
+    return "".join(kept)
 
 
 # A bare http(s) URL: not already opened with '<', not mid-word, not in `code`.
@@ -370,6 +780,70 @@ def enumerate_fields(entry):
     return pairs
 
 
+# What the bot keeps from a parse: the entries plus enough to log a bad feed.
+ParsedFeed = collections.namedtuple(
+    "ParsedFeed", ["entries", "bozo", "bozo_exception", "version"]
+)
+
+
+def to_plain(value):
+    """Deep-copy a parsed value into plain dicts/lists so it can be pickled.
+
+    feedparser_rs's typed objects can't cross a process boundary; this keeps
+    every key and scalar (including ``*_parsed`` struct_times) so the copy
+    renders exactly like the original.
+    """
+    if _is_mapping(value):
+        return {key: to_plain(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)) and not isinstance(value, time.struct_time):
+        return [to_plain(v) for v in value]
+    return value
+
+
+def _plain_entry(entry, keys):
+    """Copy entry's ``keys`` into a plain dict, leaving out missing ones.
+
+    Called by parse_feed_data().
+    """
+    plain = {}
+    for key in keys:
+        value = entry.get(key)
+        if value is not None:
+            plain[key] = to_plain(value)
+    return plain
+
+
+def parse_feed_data(data, plain=False, keys=None):
+    """Parse raw feed bytes into a ParsedFeed.
+
+    Runs in feed2discord's parse pool, so it must stay importable on its own
+    and return only picklable data when ``plain`` is set (process pools).
+    With ``plain``, ``keys`` limits each entry to those top-level keys, which
+    keeps the copy back to the bot small.  They're read with ``entry.get()``,
+    not from ``entry.items()``, so aliases such as ``description``, ``guid``
+    and ``itunes`` come through too (tools/check_parse_pool.py checks the
+    copies read like the originals).  ``bozo_exception`` comes back as its
+    repr (or None).
+    """
+    parsed = feedparser.parse(data)
+    entries = parsed.entries
+    if plain:
+        if keys is None:
+            entries = [
+                {key: to_plain(v) for key, v in entry.items()} for entry in entries
+            ]
+        else:
+            entries = [_plain_entry(entry, keys) for entry in entries]
+    bozo = bool(parsed.bozo)
+    bozo_exception = repr(parsed.get("bozo_exception")) if bozo else None
+    return ParsedFeed(entries, bozo, bozo_exception, parsed.get("version"))
+
+
+def sha256_hex(data):
+    """Hex SHA-256 of data; hashlib drops the GIL, so this runs well in a thread."""
+    return hashlib.sha256(data).hexdigest()
+
+
 def fetch_feed(url, user_agent):
     """Fetch url and parse it with feedparser_rs. Returns the parsed feed.
 
@@ -0,0 +1,45 @@
+# This software is released under an MIT-style license.
+# See LICENSE.md for full details.
+"""Shared setup for the tools/bench_*.py scripts; not a tool itself."""
+
+import atexit
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def import_bot(config_text):
+    """Import and return feed2discord, configured from config_text.
+
+    feed2discord reads its configuration (from ``--config`` in sys.argv) as
+    it's imported, so this writes config_text to a throwaway file first.
+    Any ``{tmp}`` in it becomes a throwaway directory, e.g. for db_path.
+    """
+    tmp = tempfile.mkdtemp(prefix="feed2discord-bench-")
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    path = Path(tmp, "bench.ini")
+    path.write_text(config_text.replace("{tmp}", tmp))
+    sys.argv = [sys.argv[0], "--config", str(path)]
+    import feed2discord
+
+    return feed2discord
+
+
+def big_feed(items=3000, body=2000):
+    """Return an RSS feed of ``items`` items, each with a ``body``-byte description."""
+    text = "<p>" + "lorem ipsum dolor sit amet " * (body // 27) + "</p>"
+    entries = "".join(
+        f"<item><title>Item {i}</title><link>http://example.com/{i}</link>"
+        f"<guid>g{i}</guid><pubDate>Mon, 01 Jan 2024 00:00:00 +0000</pubDate>"
+        f"<description><![CDATA[{text}]]></description>"
+        f'<enclosure url="http://example.com/{i}.mp3" length="1" type="audio/mpeg"/>'
+        "</item>"
+        for i in range(items)
+    )
+    return (
+        '<?xml version="1.0"?><rss version="2.0"><channel><title>Bench</title>'
+        f"{entries}</channel></rss>"
+    ).encode()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# This software is released under an MIT-style license.
+# See LICENSE.md for full details.
+"""Measure how long feed parsing stalls the event loop under each parse_pool.
+
+A 10 ms ticker runs on the loop while several copies of a large feed are
+parsed at once through feed2discord's _parse_feed(), the way concurrent polls
+would.  The longest gap between ticks is how long every other feed, and the
+Discord connection, would have waited:
+
+    python tools/bench_parse_pool.py
+    python tools/bench_parse_pool.py --items 1000 --modes inline,process:4
+
+Modes are ``inline`` (parse_workers = 0), ``thread[:workers]`` and
+``process[:workers]`` (2 workers unless given).  Process pools are started
+before any thread pool, as feed2discord's main() does.
+"""
+
+import argparse
+import asyncio
+import time
+
+from _bench import big_feed, import_bot
+
+CONFIG = """
+[MAIN]
+db_path = {tmp}/bench.db
+[CHANNELS]
+one = 1
+[bench]
+feed_url = http://example.com/feed
+channels = one
+fields = ##title,-#published,link,>summary
+"""
+
+
+async def _ticker(lags):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def _measure(fd, data, keys, parses):
+    """Parse data ``parses`` times at once; return (max loop lag, seconds, entries)."""
+    lags = []
+    ticker = asyncio.create_task(_ticker(lags))
+    # Warm the pool up, so its start-up isn't counted.
+    await fd._parse_feed(big_feed(1, 0), "warmup", keys)
+    await asyncio.sleep(0.05)
+    lags.clear()
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[fd._parse_feed(data, "bench", keys) for _ in range(parses)]
+    )
+    elapsed = time.perf_counter() - start
+    # Let the ticker log the gap it was woken after (all of it, inline).
+    await asyncio.sleep(0.02)
+    ticker.cancel()
+    return max(lags, default=0), elapsed, len(results[0].entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=3000, help="items in the feed")
+    parser.add_argument("--body", type=int, default=2000, help="bytes per item body")
+    parser.add_argument("--parses", type=int, default=5, help="concurrent parses")
+    parser.add_argument("--modes", default="inline,process,thread")
+    args = parser.parse_args()
+
+    fd = import_bot(CONFIG)
+    settings = fd.load_feed_settings(fd.config, fd.get_feeds_config(fd.config))
+    keys = fd._entry_keys(settings)
+    data = big_feed(args.items, args.body)
+    print(f"{len(data) / 1e6:.1f} MB feed, {args.parses} parses at once")
+
+    modes = args.modes.split(",")
+    # Fork process pools before thread pools leave threads behind.
+    modes.sort(key=lambda mode: not mode.startswith("process"))
+    for mode in modes:
+        pool, _, workers = mode.partition(":")
+        fd.MAIN["parse_pool"] = pool
+        fd.MAIN["parse_workers"] = "0" if pool == "inline" else workers or "2"
+        lag, elapsed, entries = asyncio.run(_measure(fd, data, keys, args.parses))
+        if fd._parse_executor is not None:
+            fd._parse_executor.shutdown()
+            fd._parse_executor = None
+        print(
+            f"{mode:10} {entries} entries: max loop lag {lag * 1000:6.0f} ms,"
+            f" all parsed in {elapsed:.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
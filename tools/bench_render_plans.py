@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# This software is released under an MIT-style license.
+# See LICENSE.md for full details.
+"""Time building messages from field specs compiled once versus per item.
+
+feed2discord compiles each channel's ``fields`` and filter_field into a
+RenderPlan once, when the channel is resolved.  This renders --items items
+through build_message() and _apply_channel_filter() with one shared plan,
+then again building the plan for every item -- the spec parsing the plans
+replaced -- and checks both give the same messages:
+
+    python tools/bench_render_plans.py              # about a minute
+    python tools/bench_render_plans.py --items 2000 --repeat 1
+
+The [short] section in CONFIG renders only short fields, so spec handling
+is a large part of the cost; [bodies] renders a 2 KB HTML body per item,
+which dominates.
+"""
+
+import argparse
+import time
+
+from _bench import big_feed, import_bot
+
+import feedfields
+
+CONFIG = """
+[MAIN]
+db_path = {tmp}/bench.db
+[CHANNELS]
+one = 1
+[short]
+feed_url = http://example.com/feed
+channels = one
+fields = ##title,-#published,link,**title**,`id`,[; ]links.href,"----"
+one.filter = Item
+one.filter_field = title
+[bodies]
+feed_url = http://example.com/feed
+channels = one
+fields = ##title,-#published,<link>,>summary
+"""
+
+
+def render_all(fd, settings, channel_settings, items, plan_per_item, repeat):
+    """Return (best seconds of ``repeat`` runs, messages) for rendering every item."""
+    channel = {
+        "object": None,
+        "name": channel_settings.name,
+        "id": channel_settings.id,
+        "key": channel_settings.key,
+        "settings": channel_settings,
+        "plan": fd.RenderPlan(settings, channel_settings),
+    }
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        messages = []
+        for item in items:
+            if plan_per_item:
+                channel["plan"] = fd.RenderPlan(settings, channel_settings)
+            memo = {}
+            if fd._apply_channel_filter(channel, item, settings.name, memo):
+                messages.append(fd.build_message(settings, item, channel, memo))
+        best = min(best, time.perf_counter() - start)
+    return best, messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs; best is kept")
+    args = parser.parse_args()
+
+    fd = import_bot(CONFIG)
+    entries = feedfields.parse_feed_data(big_feed(min(args.items, 2500))).entries
+    items = (entries * (args.items // len(entries) + 1))[: args.items]
+    for settings in fd.load_feed_settings(fd.config, fd.get_feeds_config(fd.config)):
+        channel_settings = settings.channels[0]
+        per_item, old = render_all(
+            fd, settings, channel_settings, items, True, args.repeat
+        )
+        once, new = render_all(
+            fd, settings, channel_settings, items, False, args.repeat
+        )
+        same = "same" if old == new else "DIFFERENT"
+        print(
+            f"{settings.name:7} {len(items)} items: compiled per item"
+            f" {per_item * 1000:6.0f} ms, once {once * 1000:6.0f} ms"
+            f" ({once / len(items) * 1e6:.0f} us/item); messages {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
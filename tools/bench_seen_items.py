@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# This software is released under an MIT-style license.
+# See LICENSE.md for full details.
+"""Time looking up and recording seen items against a large feed_items table.
+
+Compares feed2discord's batched _seen_item_ids() and executemany
+_mark_items_seen() with the one-SELECT / one-INSERT per entry they replaced,
+for a poll of each size in --entries (half of them already seen):
+
+    python tools/bench_seen_items.py
+    python tools/bench_seen_items.py --rows 100000 --entries 100,1000,5000
+
+Building the table takes a few seconds per million rows.
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from _bench import import_bot
+
+CONFIG = """
+[MAIN]
+db_path = {tmp}/bench.db
+[CHANNELS]
+"""
+
+
+def per_row_seen(conn, itemids):
+    """The old lookup: one SELECT per entry."""
+    return {
+        itemid
+        for itemid in itemids
+        if conn.execute("SELECT 1 FROM feed_items WHERE id=?", [itemid]).fetchone()
+    }
+
+
+def per_row_mark(conn, rows):
+    """The old insert: one INSERT per entry."""
+    for itemid, pubdate, urls in rows:
+        conn.execute(
+            "INSERT INTO feed_items (id,published,urls) VALUES (?,?,?)",
+            [itemid, pubdate.isoformat(), " ".join(urls)],
+        )
+
+
+def _mean_ms(fn, conn, runs):
+    """Mean milliseconds of fn(conn, arg) over each arg in runs."""
+    start = time.perf_counter()
+    for arg in runs:
+        fn(conn, arg)
+    return (time.perf_counter() - start) / len(runs) * 1000
+
+
+def _new_rows(kind, entries, runs, pubdate):
+    """One poll's worth of unseen (itemid, pubdate, urls) rows for each run."""
+    return [
+        [
+            (f"{kind}/{entries}/{run}/{i}", pubdate, [f"http://example.com/{i}"])
+            for i in range(entries)
+        ]
+        for run in range(runs)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="table size")
+    parser.add_argument("--entries", default="100,1000", help="poll sizes")
+    parser.add_argument("--runs", type=int, default=50, help="runs to average")
+    args = parser.parse_args()
+
+    fd = import_bot(CONFIG)
+    conn = fd.get_sql_connection(fd.config)
+    conn.execute(fd.SQL_CREATE_FEED_ITEMS_TBL)
+    conn.executemany(
+        "INSERT INTO feed_items (id,published) VALUES (?,?)",
+        (
+            (f"https://example.com/item/{i}", "2026-01-01T00:00:00+00:00")
+            for i in range(args.rows)
+        ),
+    )
+    conn.commit()
+    pubdate = datetime.fromisoformat("2026-01-01T00:00:00+00:00")
+
+    print(f"{args.rows} rows in feed_items; mean of {args.runs} runs")
+    for entries in map(int, args.entries.split(",")):
+        seen = entries // 2
+        itemids = [
+            f"https://example.com/item/{i}" for i in range(args.rows - seen, args.rows)
+        ] + [f"https://example.com/new/{i}" for i in range(entries - seen)]
+        assert per_row_seen(conn, itemids) == fd._seen_item_ids(conn, itemids)
+        lookups = [itemids] * args.runs
+        lookup_old = _mean_ms(per_row_seen, conn, lookups)
+        lookup_new = _mean_ms(fd._seen_item_ids, conn, lookups)
+        insert_old = _mean_ms(
+            per_row_mark, conn, _new_rows("old", entries, args.runs, pubdate)
+        )
+        insert_new = _mean_ms(
+            fd._mark_items_seen, conn, _new_rows("new", entries, args.runs, pubdate)
+        )
+        conn.rollback()
+        print(
+            f"{entries:5} entries: lookup {lookup_old:6.2f} -> {lookup_new:5.2f} ms;"
+            f" insert {insert_old:6.2f} -> {insert_new:5.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# This software is released under an MIT-style license.
+# See LICENSE.md for full details.
+"""Time skip_elements stripping on growing bodies, to check it stays linear.
+
+Each block of the generated body is a paragraph, a ``div.away`` notice with
+a nested div, and an ``<hr>``; the body is stripped with "div.away,hr", so
+every block makes two cuts.  If strip_html_elements() is linear, the time
+per block stays flat as the body grows (it grew with the body when each cut
+rescanned and rebuilt the document):
+
+    python tools/bench_strip_elements.py
+    python tools/bench_strip_elements.py --blocks 1000,10000,100000
+
+Each result is also checked against the body with those elements removed.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedfields
+
+
+def body(blocks):
+    """Return (HTML body, what stripping "div.away,hr" should leave of it)."""
+    paragraphs = [
+        f"<p>para {i} text https://example.com/{i}</p>\n" for i in range(blocks)
+    ]
+    raw = "".join(
+        f'{p}<div class="away">notice {i}<div>inner</div></div>\n<hr>\n'
+        for i, p in enumerate(paragraphs)
+    )
+    return raw, "".join(p + "\n\n" for p in paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", default="500,1000,2000,4000,8000")
+    args = parser.parse_args()
+
+    failed = False
+    for blocks in map(int, args.blocks.split(",")):
+        raw, want = body(blocks)
+        start = time.perf_counter()
+        got = feedfields.strip_html_elements(raw, "div.away,hr")
+        elapsed = time.perf_counter() - start
+        failed = failed or got != want
+        print(
+            f"{blocks:6} blocks ({len(raw) // 1024:5} KB, {2 * blocks:6} cuts):"
+            f" {elapsed * 1000:7.1f} ms, {elapsed / blocks * 1e6:5.1f} us/block"
+            f"{'' if got == want else '  WRONG OUTPUT'}"
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# This software is released under an MIT-style license.
+# See LICENSE.md for full details.
+"""Check that feeds parsed in a process pool read the same as in a thread pool.
+
+With ``parse_pool = process`` (the default) feed2discord gets each entry back
+as a plain dict holding only the keys its fields need (see
+feedfields.parse_feed_data and feed2discord's _entry_keys), because
+feedparser_rs's own objects can't be pickled.  Every field spec must still
+resolve exactly as it does on the original entry -- including the aliases
+feedparser_rs answers in ``get()`` but leaves out of ``items()``, such as
+``description``, ``guid`` and ``itunes``.  Run this after changing how
+entries are copied:
+
+    python tools/check_parse_pool.py
+
+It parses a few sample feeds in both kinds of pool, resolves and renders
+every field in FIELDS from both results, and exits non-zero if any differ.
+"""
+
+import argparse
+import concurrent.futures
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedfields
+
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"
+     xmlns:dc="http://purl.org/dc/elements/1.1/">
+<channel><title>Sample</title><link>http://example.com/</link>
+<item>
+  <title>T1</title><link>http://example.com/1</link>
+  <description>Body &lt;b&gt;number&lt;/b&gt; 1 here</description>
+  <guid isPermaLink="false">galnet-1</guid>
+  <pubDate>Mon, 06 Sep 2021 16:45:00 +0000</pubDate>
+  <comments>http://example.com/1#comments</comments>
+  <category>news</category><category>other</category>
+  <dc:creator>Someone</dc:creator>
+  <enclosure url="http://example.com/1.mp3" length="123" type="audio/mpeg"/>
+  <itunes:duration>12:34</itunes:duration>
+  <itunes:explicit>no</itunes:explicit>
+</item>
+<item>
+  <title>T2 &amp; more</title><link>http://example.com/2</link>
+  <description>Second &lt;i&gt;body&lt;/i&gt;</description>
+  <guid>http://example.com/2</guid>
+</item>
+</channel></rss>
+"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>Atom sample</title><id>urn:feed</id><updated>2021-09-06T16:45:00Z</updated>
+<entry>
+  <title>A1</title><id>urn:a1</id><link href="http://example.com/a1"/>
+  <updated>2021-09-06T16:45:00Z</updated><published>2021-09-05T10:00:00Z</published>
+  <summary>Short &lt;b&gt;summary&lt;/b&gt;</summary>
+  <content type="html">&lt;p&gt;Full &lt;em&gt;content&lt;/em&gt;&lt;/p&gt;</content>
+  <author><name>Writer</name></author>
+  <category term="tag1"/>
+</entry>
+</feed>
+"""
+
+FEEDS = {"rss": RSS, "atom": ATOM}
+
+# Field specs as written in a feed's ``fields =`` line, minus the formatting
+# prefixes (they don't change which entry key is read).
+FIELDS = [
+    "id", "guid", "link", "title", "summary", "description", "content",
+    "published", "pubDate", "date", "updated", "modified", "issued", "created",
+    "author", "comments", "category", "tags", "tags.term", "enclosures.href",
+    "enclosures.type", "links.href", "itunes.duration", "itunes.explicit",
+    "dc_creator", "author_detail.name", "nosuchfield", "nosuch.field",
+]  # fmt: skip
+
+
+def entry_keys(fields):
+    """Top-level keys for fields, the way feed2discord's _entry_keys picks them."""
+    return frozenset(field.split(".", 1)[0] for field in fields)
+
+
+def check(fields):
+    """Parse every feed in both pools; return a list of differences."""
+    keys = entry_keys(fields)
+    differences = []
+    with (
+        concurrent.futures.ThreadPoolExecutor(1) as threads,
+        concurrent.futures.ProcessPoolExecutor(1) as processes,
+    ):
+        for name, data in FEEDS.items():
+            live = threads.submit(feedfields.parse_feed_data, data).result()
+            plain = processes.submit(
+                feedfields.parse_feed_data, data, True, keys
+            ).result()
+            if len(live.entries) != len(plain.entries):
+                differences.append((name, "entry count", live, plain))
+                continue
+            for index, (want, got) in enumerate(zip(live.entries, plain.entries)):
+                for field in fields:
+                    want_value = feedfields.resolve_field(want, field)
+                    got_value = feedfields.resolve_field(got, field)
+                    if want_value is not None:
+                        want_value = feedfields.render_text_field(want_value)
+                    if got_value is not None:
+                        got_value = feedfields.render_text_field(got_value)
+                    if want_value != got_value:
+                        differences.append(
+                            (f"{name}[{index}]", field, want_value, got_value)
+                        )
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    differences = check(FIELDS)
+    print(
+        f"{len(FEEDS)} feeds, {len(FIELDS)} fields: {len(differences)} differ"
+        " between the thread and process pools"
+    )
+    for where, field, want, got in differences[:10]:
+        print(f"\n--- {where} {field}:\n thread:  {want!r}\n process: {got!r}")
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()